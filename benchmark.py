@@ -0,0 +1,146 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Any, List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from core.network import TreeType, Network, create_network
+from core.tree import build_ordered, build_balanced
+
+
+class Benchmark(NamedTuple):
+    name: str
+    run: Callable[[Network, str], Any]
+
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark("build_ordered", lambda net, dataset: build_ordered(list(net.nodes))),
+    Benchmark("build_balanced", lambda net, dataset: build_balanced(list(net.nodes))),
+    Benchmark("left_to_right", lambda net, dataset: net.tree.left_to_right),
+    Benchmark("get_intervals", lambda net, dataset: net.get_intervals()),
+    Benchmark("observations", lambda net, dataset: net.observations(dataset)),
+    Benchmark("get_dataset_copies", lambda net, dataset: net.get_dataset_copies(dataset)),
+    Benchmark("print_dataset_intervals", lambda net, dataset: net.print_dataset_intervals(dataset)),
+    Benchmark("distribute_series", lambda net, dataset: net.distribute_series(dataset)),
+    Benchmark("distribute_series_delta", lambda net, dataset: net.distribute_series(dataset, delta=True)),
+    Benchmark("tick", lambda net, dataset: net.tick()),
+    Benchmark("add_node", lambda net, dataset: net.create_nodes(1, 1)),
+]
+
+
+def measure(run: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Returns the best wall time of several runs and the peak memory allocated during a separate traced run."""
+    seconds = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            seconds.append(time.perf_counter() - started)
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"seconds": min(seconds), "peak_bytes": peak}
+
+
+def report(key: str, result: Dict[str, float]):
+    print(f"{key}: {result['seconds']:.4f} s, {result['peak_bytes'] / 2 ** 20:.2f} MiB")
+
+
+def run_benchmarks(sizes: List[int],
+                   days_of_data: List[int],
+                   repeat: int,
+                   only: List[str] = None,
+                   tree_type: TreeType = TreeType.balanced_ltor) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for nodes_cnt in sizes:
+        for days in days_of_data:
+            case = f"n={nodes_cnt},days={days},tree={tree_type.name}"
+            if not only or "create_network" in only:
+                key = f"create_network[{case}]"
+                results[key] = measure(lambda: create_network(nodes_cnt, days, tree_type=tree_type), repeat)
+                report(key, results[key])
+            net = create_network(nodes_cnt, days, tree_type=tree_type)
+            dataset = next(iter(net.nodes.values())).own_data.columns[0]
+            net.distribute_series(dataset)
+            for benchmark in BENCHMARKS:
+                if only and benchmark.name not in only:
+                    continue
+                key = f"{benchmark.name}[{case}]"
+                results[key] = measure(lambda: benchmark.run(net, dataset), repeat)
+                report(key, results[key])
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Dict[str, float]],
+            tolerance: float,
+            min_seconds: float) -> List[str]:
+    """Returns a description of every measurement exceeding its baseline by more than the relative tolerance.
+    Time differences below `min_seconds` are treated as noise."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result["seconds"] > base["seconds"] * (1 + tolerance) and result["seconds"] - base["seconds"] > min_seconds:
+            regressions.append(f"{key}: {result['seconds']:.4f} s (baseline {base['seconds']:.4f} s)")
+        if result["peak_bytes"] > base["peak_bytes"] * (1 + tolerance) \
+                and result["peak_bytes"] - base["peak_bytes"] > 2 ** 20:
+            regressions.append(f"{key}: {result['peak_bytes']} bytes peak (baseline {base['peak_bytes']} bytes)")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Times the network hot paths and compares them against a baseline.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000, 10000])
+    parser.add_argument("--days", nargs="+", type=int, default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", default=None,
+                        choices=["create_network"] + [benchmark.name for benchmark in BENCHMARKS])
+    parser.add_argument("--tree-type", default=TreeType.balanced_ltor.name, choices=[t.name for t in TreeType])
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default="benchmark_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown")
+    parser.add_argument("--min-seconds", type=float, default=0.001, help="ignored absolute slowdown")
+    args = parser.parse_args()
+
+    measured = run_benchmarks(args.sizes, args.days, args.repeat, args.only, TreeType[args.tree_type])
+    output = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": measured,
+    }
+    with open(args.output, "w") as file:
+        json.dump(output, file, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(output, file, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        if not any(key in baseline for key in measured):
+            print(f"\nNo measurement has a baseline in {args.baseline}, e.g. it was saved for another tree type")
+            sys.exit(1)
+        found = compare(measured, baseline, args.tolerance, args.min_seconds)
+        if found:
+            print(f"\n{len(found)} regressions against {args.baseline}:")
+            for regression in found:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}")
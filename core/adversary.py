@@ -0,0 +1,91 @@
+from typing import Callable, List
+
+import numpy as np
+
+from .network import Network
+from .node import Node
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+Strategy = Callable[["CollusionSimulation", int, np.random.Generator], np.ndarray]
+
+
+def popcount(bits: np.ndarray) -> np.ndarray:
+    """Returns the amount of set bits along the last axis of a uint64 array."""
+    return _POPCOUNT[bits.view(np.uint8)].sum(axis=-1)
+
+
+class CollusionSimulation:
+    """Packs the day coverage of a dataset of every node but the owner into a bitset matrix (nodes x days, packed
+    into uint64 words), so that the share of the dataset a coalition of colluding nodes can reconstruct is evaluated
+    with vectorized OR and popcount over thousands of coalitions at once."""
+    names: List[str]
+    bits: np.ndarray
+    days: int
+
+    def __init__(self, net: Network, dataset: str):
+        earliest, latest = net.dataset_span(dataset)
+        self.days = (latest - earliest).days + 1
+        starts, ends, holders = net.held_intervals(dataset, exclude_owner=True)
+        owner = list(net.nodes).index(net.owner_lookup[dataset].name)
+        self.names = [name for i, name in enumerate(net.nodes) if i != owner]
+        rows = holders - (holders > owner)
+        diff = np.zeros([len(self.names), self.days + 1], dtype=np.int32)
+        np.add.at(diff, (rows, starts), 1)
+        np.add.at(diff, (rows, ends), -1)
+        held = np.cumsum(diff[:, :-1], axis=1) > 0
+        words = -(-self.days // 64)
+        packed = np.zeros([len(self.names), words * 8], dtype=np.uint8)
+        packed[:, :-(-self.days // 8)] = np.packbits(held, axis=1, bitorder="little")
+        self.bits = packed.view(np.uint64)
+
+    def coverage(self, coalitions: np.ndarray) -> np.ndarray:
+        """Returns the reconstructable share of the dataset for every coalition, given as rows of node positions."""
+        coalitions = np.atleast_2d(coalitions)
+        return popcount(np.bitwise_or.reduce(self.bits[coalitions], axis=1)) / self.days
+
+    def random_coalitions(self, size: int, samples: int, rng: np.random.Generator = None) -> np.ndarray:
+        """Draws coalitions of distinct nodes uniformly at random."""
+        rng = np.random.default_rng() if rng is None else rng
+        return np.argpartition(rng.random([samples, len(self.names)]), size - 1, axis=1)[:, :size]
+
+    def greedy_coalition(self, size: int, rng: np.random.Generator = None) -> np.ndarray:
+        """Deterministic attack: repeatedly adds the node contributing the most days not yet known to the coalition."""
+        known = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        coalition: List[int] = []
+        for _ in range(min(size, len(self.names))):
+            gains = popcount(self.bits & ~known)
+            gains[coalition] = -1
+            best = int(np.argmax(gains))
+            coalition.append(best)
+            known |= self.bits[best]
+        return np.array(coalition, dtype=np.int64)
+
+    def monte_carlo(self,
+                    size: int,
+                    samples: int,
+                    rng: np.random.Generator = None,
+                    batch: int = 1024) -> np.ndarray:
+        """Returns the reconstructable share of the dataset for `samples` random coalitions of given size."""
+        rng = np.random.default_rng() if rng is None else rng
+        results = [self.coverage(self.random_coalitions(size, min(batch, samples - done), rng))
+                   for done in range(0, samples, batch)]
+        return np.concatenate(results) if results else np.empty(0)
+
+    def evaluate(self, strategy: Strategy, size: int, rng: np.random.Generator = None) -> float:
+        """Returns the reconstructable share of the dataset for the coalition chosen by a strategy."""
+        rng = np.random.default_rng() if rng is None else rng
+        return float(self.coverage(strategy(self, size, rng))[0])
+
+
+def switch_identity(net: Network, name: str) -> Node:
+    """Lets a node leave the network and rejoin under a new identity with new own datasets of the same amount of
+    features. The node keeps everything it received before, so its knowledge accumulates across identities."""
+    node = net.nodes[name]
+    received = node.received_data
+    features_cnt = len(node.own_data.columns)
+    net.remove_node(name)
+    rejoined = net.create_nodes(1, features_cnt)[0]
+    rejoined.received_data = received
+    net.node_changed(rejoined.name)
+    return rejoined
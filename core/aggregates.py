@@ -0,0 +1,150 @@
+import heapq
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .node import Node
+
+
+class NetworkAggregates:
+    """Incrementally maintained earliest and latest day of the data of all nodes. The network re-indexes a node
+    whenever it changes the node's data. Extreme days live in heaps with lazy deletion, so that queries take amortized
+    O(1) instead of scanning every node."""
+    _bounds: Dict[str, Tuple[int, int]]
+    _earliest: List[Tuple[int, str]]
+    _latest: List[Tuple[int, str]]
+
+    def __init__(self):
+        self._bounds = {}
+        self._earliest = []
+        self._latest = []
+
+    def update(self, node: Node):
+        """Indexes the current first and last day of the data of a node."""
+        bounds = node.bounds
+        if bounds is None:
+            self.remove(node.name)
+            return
+        bounds = (bounds[0].toordinal(), bounds[1].toordinal())
+        previous = self._bounds.get(node.name)
+        if previous == bounds:
+            return
+        self._bounds[node.name] = bounds
+        if previous is None or previous[0] != bounds[0]:
+            heapq.heappush(self._earliest, (bounds[0], node.name))
+        if previous is None or previous[1] != bounds[1]:
+            heapq.heappush(self._latest, (-bounds[1], node.name))
+        if len(self._earliest) + len(self._latest) > 4 * len(self._bounds) + 64:
+            self._compact()
+
+    def remove(self, name: str):
+        self._bounds.pop(name, None)
+
+    @property
+    def earliest(self) -> Optional[date]:
+        while self._earliest and self._bounds.get(self._earliest[0][1], (None,))[0] != self._earliest[0][0]:
+            heapq.heappop(self._earliest)
+        return date.fromordinal(self._earliest[0][0]) if self._earliest else None
+
+    @property
+    def latest(self) -> Optional[date]:
+        while self._latest and self._bounds.get(self._latest[0][1], (None, None))[1] != -self._latest[0][0]:
+            heapq.heappop(self._latest)
+        return date.fromordinal(-self._latest[0][0]) if self._latest else None
+
+    def _compact(self):
+        """Drops all outdated heap entries."""
+        self._earliest = [(first, name) for name, (first, _) in self._bounds.items()]
+        self._latest = [(-last, name) for name, (_, last) in self._bounds.items()]
+        heapq.heapify(self._earliest)
+        heapq.heapify(self._latest)
+
+
+class ObservationIndex:
+    """Observation counts of the received datasets of all nodes, one column per dataset with a row per node in the order
+    the nodes joined. Changes only mark the rows of the touched nodes, a query recounts the marked rows of the queried
+    column. Distributions therefore pay O(nodes) instead of a count per node and dataset, and queries only ask the nodes
+    which changed since the previous query of the same dataset."""
+    _slots: Dict[str, int]
+    _nodes: List[Optional[Node]]
+    _live: np.ndarray
+    _changed: np.ndarray  # version at which every row last changed
+    _counts: Dict[str, np.ndarray]
+    _counted: Dict[str, np.ndarray]  # version at which every row of a column was last counted
+    _version: int
+    _size: int
+
+    def __init__(self):
+        self._slots = {}
+        self._nodes = []
+        self._live = np.zeros(64, dtype=bool)
+        self._changed = np.zeros(64, dtype=np.int64)
+        self._counts = {}
+        self._counted = {}
+        self._version = 0
+        self._size = 0
+
+    def update(self, node: Node):
+        """Marks the counts of a node as outdated."""
+        slot = self._slots.get(node.name)
+        if slot is None:
+            slot = self._add(node)
+        self._nodes[slot] = node
+        self._version += 1
+        self._changed[slot] = self._version
+
+    def remove(self, name: str):
+        slot = self._slots.pop(name, None)
+        if slot is None:
+            return
+        self._nodes[slot] = None
+        self._live[slot] = False
+        if self._size > 2 * len(self._slots) + 64:
+            self._compact()
+
+    def observations(self, dataset: str) -> np.ndarray:
+        """Returns the counts of a dataset in the order of the nodes."""
+        if dataset not in self._counts:
+            self._counts[dataset] = np.zeros(len(self._changed))
+            self._counted[dataset] = np.full(len(self._changed), -1, dtype=np.int64)
+        column, counted = self._counts[dataset], self._counted[dataset]
+        nodes = self._nodes
+        for slot in np.flatnonzero(self._changed[:self._size] > counted[:self._size]):
+            if nodes[slot] is not None:
+                column[slot] = nodes[slot].observations(dataset)
+        counted[:self._size] = self._version
+        return column[:self._size][self._live[:self._size]]
+
+    def _add(self, node: Node) -> int:
+        if self._size == len(self._changed):
+            self._resize(2 * len(self._changed))
+        slot = self._slots[node.name] = self._size
+        self._nodes.append(node)
+        self._live[slot] = True
+        self._size += 1
+        return slot
+
+    def _resize(self, capacity: int):
+        self._changed = np.resize(self._changed, capacity)
+        self._live = np.resize(self._live, capacity)
+        self._live[self._size:] = False
+        for dataset in self._counts:
+            self._counts[dataset] = np.resize(self._counts[dataset], capacity)
+            self._counted[dataset] = np.resize(self._counted[dataset], capacity)
+            self._counted[dataset][self._size:] = -1
+
+    def _compact(self):
+        """Drops the rows of removed nodes."""
+        keep = np.array([slot for slot, node in enumerate(self._nodes) if node is not None], dtype=np.int64)
+        self._slots = {self._nodes[slot].name: i for i, slot in enumerate(keep)}
+        self._nodes = [self._nodes[slot] for slot in keep]
+        capacity = max(2 * len(keep), 64)
+        self._changed = np.resize(self._changed[keep], capacity)
+        self._live = np.zeros(capacity, dtype=bool)
+        self._live[:len(keep)] = True
+        for dataset in self._counts:
+            self._counts[dataset] = np.resize(self._counts[dataset][keep], capacity)
+            self._counted[dataset] = np.resize(self._counted[dataset][keep], capacity)
+            self._counted[dataset][len(keep):] = -1
+        self._size = len(keep)
@@ -0,0 +1,52 @@
+from typing import List, Tuple
+
+import numpy as np
+
+
+class IntervalAssignment:
+    """Assigns every node a contiguous share of the dataset's time span. A joining node takes over half of the widest
+    interval and a leaving node hands its interval to its narrower neighbour, so a membership change only moves the
+    data of a single interval instead of shifting every boundary."""
+    names: List[str]
+    widths: List[float]
+
+    def __init__(self):
+        self.names = []
+        self.widths = []
+
+    def join(self, name: str) -> Tuple[float, float]:
+        """Adds a node and returns the share of the span it takes over."""
+        if not self.names:
+            self.names.append(name)
+            self.widths.append(1.0)
+            return 0.0, 1.0
+        widest = max(range(len(self.widths)), key=self.widths.__getitem__)
+        half = self.widths[widest] / 2
+        self.widths[widest] = half
+        self.names.insert(widest + 1, name)
+        self.widths.insert(widest + 1, half)
+        start = sum(self.widths[:widest + 1])
+        return start, start + half
+
+    def leave(self, name: str) -> Tuple[float, float]:
+        """Removes a node and returns the share of the span handed over to its neighbour."""
+        index = self.names.index(name)
+        del self.names[index]
+        width = self.widths.pop(index)
+        start = sum(self.widths[:index])
+        if self.names:
+            left, right = index - 1, index
+            if right == len(self.names) or (left >= 0 and self.widths[left] <= self.widths[right]):
+                self.widths[left] += width
+            else:
+                self.widths[right] += width
+        return start, start + width
+
+    def bounds(self) -> np.ndarray:
+        """Returns the boundaries of all intervals as fractions of the span, in the order of `names`."""
+        bounds = np.concatenate([[0.0], np.cumsum(self.widths)])
+        bounds[-1] = 1.0
+        return bounds
+
+    def __len__(self):
+        return len(self.names)
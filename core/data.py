@@ -1,8 +1,10 @@
-from datetime import datetime, date
-from typing import List, Any, Union, Optional
+from datetime import datetime, date, timedelta
+from typing import List, Any, Union, Optional, Tuple, Dict, Callable
 import pandas as pd
 import numpy as np
 
+from .instrumentation import instrumentation
+
 
 class DailySeries(pd.DataFrame):
     @property
@@ -48,6 +50,15 @@ class DailySeries(pd.DataFrame):
             self._update_inplace(df)
         return df
 
+    def held_intervals(self, feature: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the first and last days of all runs of non-zero observations of a feature."""
+        days = self.index.values.astype("datetime64[D]")
+        days = days[np.nan_to_num(self.to_numpy()[:, self.columns.get_loc(feature)]) > 0]
+        if len(days) == 0:
+            return days, days
+        breaks = np.flatnonzero(np.diff(days) > np.timedelta64(1, "D"))
+        return days[np.r_[0, breaks + 1]], days[np.r_[breaks, len(days) - 1]]
+
     def __copy__(self, *args, **kwargs) -> 'DailySeries':
         return DailySeries(super().__copy__(*args, **kwargs))
 
@@ -58,6 +69,504 @@ class DailySeries(pd.DataFrame):
         return DailySeries(super().__getitem__(item))
 
 
+class DailyBuffer:
+    """Append-optimized storage for daily observations of several features. Rows live in a preallocated array whose
+    capacity grows geometrically, so adding an observation is amortized O(1) instead of reindexing a whole frame.
+    `earliest` and `latest` are tracked as fields. Copies share their rows until either side writes to them."""
+    columns: List[str]
+    earliest: Optional[date]
+    latest: Optional[date]
+    _data: np.ndarray
+    _length: int
+    _shared: bool
+
+    def __init__(self, columns: List[str], start: Union[date, str], capacity: int = 1):
+        self.columns = list(columns)
+        self.earliest = pd.to_datetime(start).date()
+        self.latest = None
+        self._data = np.zeros([max(capacity, 1), len(self.columns)], dtype=np.int8)
+        self._length = 0
+        self._shared = False
+
+    @classmethod
+    def from_daily_series(cls, data: DailySeries) -> "DailyBuffer":
+        buffer = cls(data.columns, data.earliest, len(data))
+        buffer._length = len(data)
+        buffer._data[:len(data)] = np.nan_to_num(data.to_numpy())
+        buffer.latest = data.latest
+        return buffer
+
+    @classmethod
+    def from_array(cls, columns: List[str], start: date, data: np.ndarray) -> "DailyBuffer":
+        """Wraps rows of observations without copying them, e.g. a memory-mapped array, which is only copied once
+        it is written to."""
+        buffer = cls(columns, start)
+        buffer._data, buffer._length, buffer._shared = data, len(data), True
+        buffer.latest = start + timedelta(len(data) - 1) if len(data) else None
+        return buffer
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return pd.date_range(start=self.earliest, periods=self._length, freq="1D")
+
+    @property
+    def data(self) -> np.ndarray:
+        """Read-only view of the observed rows."""
+        view = self._data[:self._length]
+        view.flags.writeable = False
+        return view
+
+    def reserve(self, end: Union[date, str]):
+        """Grows the capacity to hold all days until the given date, at least doubling it."""
+        self._grow((pd.to_datetime(end).date() - self.earliest).days + 1)
+
+    def _grow(self, rows: int):
+        if rows > len(self._data):
+            data = np.zeros([max(rows, 2 * len(self._data)), len(self.columns)], dtype=np.int8)
+            data[:self._length] = self._data[:self._length]
+            self._data, self._shared = data, False
+            instrumentation.count("buffer_allocations")
+            instrumentation.count("bytes_copied", self._data[:self._length].nbytes)
+
+    def add_observation(self, day: date):
+        """Adds a new observation for all columns."""
+        self.add_observations(day, day)
+
+    def add_observations(self, start: date, end: date):
+        """Adds an observation on every day from start to end for all columns at once."""
+        if start < self.earliest:
+            shift = (self.earliest - start).days
+            data = np.zeros([shift + len(self._data), len(self.columns)], dtype=np.int8)
+            data[shift:shift + self._length] = self._data[:self._length]
+            self._data, self._length, self.earliest, self._shared = data, self._length + shift, start, False
+        first, last = (start - self.earliest).days, (end - self.earliest).days
+        if last >= self._length:
+            self._grow(last + 1)
+            self._length = last + 1
+            self.latest = end
+        if self._shared:
+            self._data, self._shared = self._data.copy(), False
+            instrumentation.count("bytes_copied", self._data.nbytes)
+        self._data[first:last + 1] += 1
+
+    def held_intervals(self, feature: str) -> "IntervalSet":
+        """Returns the runs of days with observations of a feature."""
+        observed = np.zeros(self._length + 2, dtype=np.int8)
+        observed[1:-1] = self._data[:self._length, self.columns.index(feature)] > 0
+        edges = np.diff(observed)
+        first = np.datetime64(self.earliest, "D")
+        return IntervalSet.from_normalized(first + np.flatnonzero(edges == 1), first + np.flatnonzero(edges == -1))
+
+    def to_daily_series(self, features: [str] = None) -> DailySeries:
+        """Returns a dense view of the buffer."""
+        features = features if features else self.columns
+        columns = [self.columns.index(feature) for feature in features]
+        instrumentation.count("dataframe_allocations")
+        return DailySeries(data=self._data[:self._length, columns], columns=features, index=self.index)
+
+    def __getitem__(self, item) -> DailySeries:
+        return self.to_daily_series([item] if isinstance(item, str) else item)
+
+    def __delitem__(self, item: str):
+        column = self.columns.index(item)
+        self._data = np.delete(self._data, column, axis=1)
+        del self.columns[column]
+
+    def __add__(self, other: Union["DailyBuffer", DailySeries]) -> "DailyBuffer":
+        if isinstance(other, DailyBuffer):
+            other = other.to_daily_series()
+        return DailyBuffer.from_daily_series(self.to_daily_series() + other)
+
+    def __copy__(self) -> "DailyBuffer":
+        buffer = DailyBuffer(self.columns, self.earliest)
+        buffer._data, buffer._length, buffer.latest = self._data, self._length, self.latest
+        buffer._shared = self._shared = True
+        return buffer
+
+    def __len__(self):
+        return self._length
+
+
+class IntervalSet:
+    """Sorted, disjoint and non-adjacent half-open day intervals [start, end). Memory and the cost of all operations
+    scale with the amount of intervals instead of the amount of days."""
+    starts: np.ndarray
+    ends: np.ndarray
+
+    def __init__(self, starts: np.ndarray = None, ends: np.ndarray = None):
+        starts = np.empty(0, dtype="datetime64[D]") if starts is None else np.asarray(starts, dtype="datetime64[D]")
+        ends = np.empty(0, dtype="datetime64[D]") if ends is None else np.asarray(ends, dtype="datetime64[D]")
+        non_empty = starts < ends
+        if not non_empty.all():
+            starts, ends = starts[non_empty], ends[non_empty]
+        if len(starts) > 1:
+            order = np.argsort(starts, kind="stable")
+            starts, ends = starts[order], ends[order]
+            reach = np.maximum.accumulate(ends)
+            first = np.ones(len(starts), dtype=bool)
+            first[1:] = starts[1:] > reach[:-1]
+            last = np.ones(len(starts), dtype=bool)
+            last[:-1] = first[1:]
+            starts, ends = starts[first], reach[last]
+        self.starts, self.ends = starts, ends
+
+    @classmethod
+    def from_normalized(cls, starts: np.ndarray, ends: np.ndarray) -> "IntervalSet":
+        """Wraps intervals which are already sorted, disjoint and non-adjacent without copying them."""
+        intervals = cls()
+        intervals.starts, intervals.ends = starts, ends
+        return intervals
+
+    @property
+    def earliest(self) -> Optional[date]:
+        return self.starts[0].astype(date) if len(self.starts) else None
+
+    @property
+    def latest(self) -> Optional[date]:
+        return (self.ends[-1] - 1).astype(date) if len(self.ends) else None
+
+    def count(self) -> int:
+        """Returns the amount of days covered."""
+        return int((self.ends - self.starts).astype(np.int64).sum())
+
+    def contains(self, days: np.ndarray) -> np.ndarray:
+        """Returns for every given day whether it is covered."""
+        days = np.asarray(days, dtype="datetime64[D]")
+        if len(self.starts) == 0:
+            return np.zeros(days.shape, dtype=bool)
+        k = np.searchsorted(self.starts, days, side="right") - 1
+        return (k >= 0) & (days < self.ends[np.maximum(k, 0)])
+
+    def clip(self, start: np.datetime64, end: np.datetime64) -> "IntervalSet":
+        """Returns the covered days within [start, end)."""
+        first = np.searchsorted(self.ends, start, side="right")
+        last = np.searchsorted(self.starts, end, side="left")
+        return IntervalSet(np.maximum(self.starts[first:last], start), np.minimum(self.ends[first:last], end))
+
+    def union(self, other: "IntervalSet") -> "IntervalSet":
+        return IntervalSet(np.concatenate([self.starts, other.starts]), np.concatenate([self.ends, other.ends]))
+
+    def intersection(self, other: "IntervalSet") -> "IntervalSet":
+        return self._combine(other, np.logical_and)
+
+    def difference(self, other: "IntervalSet") -> "IntervalSet":
+        return self._combine(other, lambda held, removed: held & ~removed)
+
+    def _combine(self, other: "IntervalSet", op: Callable[[np.ndarray, np.ndarray], np.ndarray]) -> "IntervalSet":
+        """Applies a boolean operation on the elementary segments between all interval boundaries."""
+        bounds = np.unique(np.concatenate([self.starts, self.ends, other.starts, other.ends]))
+        segment_starts, segment_ends = bounds[:-1], bounds[1:]
+        keep = op(self.contains(segment_starts), other.contains(segment_starts))
+        return IntervalSet(segment_starts[keep], segment_ends[keep])
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __eq__(self, other):
+        return isinstance(other, IntervalSet) and np.array_equal(self.starts, other.starts) \
+            and np.array_equal(self.ends, other.ends)
+
+    def __repr__(self):
+        intervals = ", ".join(f"[{start}, {end})" for start, end in zip(self.starts, self.ends))
+        return f"IntervalSet({intervals})"
+
+
+class IntervalSeries:
+    """Sparse counterpart to DailySeries, storing for every feature only the intervals of days held. Every feature has
+    a slot in flat arrays holding a single interval [start, end), empty if start >= end, which is what distribution
+    produces almost always. Features split into several intervals are kept as IntervalSets besides. Batches of
+    intervals for many features are merged with a few vectorized operations, so one series can hold thousands of
+    features without an object per feature. Copies share their arrays until either side writes to them."""
+    _slots: Dict[str, int]
+    _features: List[str]
+    _starts: np.ndarray
+    _ends: np.ndarray
+    _split: Dict[int, IntervalSet]
+    _shared: bool
+    _bounds: Optional[Tuple[Optional[date], Optional[date]]]  # cached earliest and latest day, None if outdated
+
+    def __init__(self, features: Dict[str, IntervalSet] = None):
+        self._slots = {}
+        self._features = []
+        self._starts = np.zeros(0, dtype="datetime64[D]")
+        self._ends = np.zeros(0, dtype="datetime64[D]")
+        self._split = {}
+        self._shared = False
+        self._bounds = None
+        for feature, intervals in ({} if features is None else features).items():
+            self[feature] = intervals
+
+    @classmethod
+    def from_intervals(cls, features: List[str], starts: np.ndarray, ends: np.ndarray) -> "IntervalSeries":
+        """Creates a series from one interval per entry, features may repeat."""
+        series = cls()
+        series.add_intervals(features, starts, ends)
+        return series
+
+    @classmethod
+    def from_arrays(cls, features: List[str], starts: np.ndarray, ends: np.ndarray,
+                    split: Dict[str, IntervalSet] = None) -> "IntervalSeries":
+        """Wraps the slot arrays of a series without copying them, e.g. memory-mapped arrays, which are only copied
+        once they are written to."""
+        series = cls()
+        series._slots = {feature: slot for slot, feature in enumerate(features)}
+        series._features = list(features)
+        series._starts, series._ends, series._shared = starts, ends, True
+        series._split = {series._slots[feature]: intervals for feature, intervals in (split or {}).items()}
+        return series
+
+    @classmethod
+    def from_daily_series(cls, data: DailySeries) -> "IntervalSeries":
+        features = {}
+        for feature in data.columns:
+            starts, ends = data.held_intervals(feature)
+            features[feature] = IntervalSet(starts, ends + 1)
+        return cls(features)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._features)
+
+    @property
+    def features(self) -> Dict[str, IntervalSet]:
+        return {feature: self._get(slot) for slot, feature in enumerate(self._features)}
+
+    @property
+    def split(self) -> Dict[str, IntervalSet]:
+        """The features held in several intervals."""
+        return {self._features[slot]: intervals for slot, intervals in self._split.items()}
+
+    @property
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Read-only views of the single interval or bounds of every feature, in the order of `columns`."""
+        starts, ends = self._starts[:len(self._slots)], self._ends[:len(self._slots)]
+        starts.flags.writeable = ends.flags.writeable = False
+        return starts, ends
+
+    @property
+    def earliest(self) -> Optional[date]:
+        return self.bounds[0]
+
+    @property
+    def latest(self) -> Optional[date]:
+        return self.bounds[1]
+
+    @property
+    def bounds(self) -> Tuple[Optional[date], Optional[date]]:
+        """The earliest and latest day held, cached until the series changes."""
+        if self._bounds is None:
+            starts, ends = self._starts[:len(self._features)], self._ends[:len(self._features)]
+            non_empty = starts < ends
+            if non_empty.any():
+                self._bounds = starts[non_empty].min().astype(date), (ends[non_empty].max() - 1).astype(date)
+            else:
+                self._bounds = None, None
+        return self._bounds
+
+    def intervals(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Returns all held intervals as parallel lists of features, starts and ends."""
+        starts, ends = self.arrays
+        features = np.array(self._features, dtype=object)
+        single = starts < ends
+        if self._split:
+            single[list(self._split)] = False
+        split = [(slot, intervals) for slot, intervals in sorted(self._split.items())]
+        return list(features[single]) + [features[slot] for slot, intervals in split for _ in range(len(intervals))], \
+            np.concatenate([starts[single]] + [intervals.starts for _, intervals in split]), \
+            np.concatenate([ends[single]] + [intervals.ends for _, intervals in split])
+
+    def add(self, other: Union["IntervalSeries", DailySeries]):
+        """Merges other data into this series in place."""
+        if isinstance(other, DailySeries):
+            other = IntervalSeries.from_daily_series(other)
+        self._allocate(other.columns)
+        self.add_intervals(*other.intervals())
+
+    def remove(self, other: "IntervalSeries"):
+        """Removes the days of other data from this series in place."""
+        self.remove_intervals(*other.intervals())
+
+    def add_intervals(self, features: List[str], starts: np.ndarray, ends: np.ndarray):
+        """Merges one interval per entry into the features in place, adding features not held yet."""
+        slots = self._allocate(features)
+        starts = np.asarray(starts, dtype="datetime64[D]")
+        ends = np.asarray(ends, dtype="datetime64[D]")
+        non_empty = starts < ends
+        slots, starts, ends = slots[non_empty], starts[non_empty], ends[non_empty]
+        if len(slots) == 0:
+            return
+        self._writable()
+        held_starts, held_ends = self._starts[slots], self._ends[slots]
+        empty = held_starts >= held_ends
+        fast = self._single(slots) & (empty | ((starts <= held_ends) & (held_starts <= ends)))
+        self._starts[slots[fast]] = np.where(empty[fast], starts[fast], np.minimum(held_starts[fast], starts[fast]))
+        self._ends[slots[fast]] = np.where(empty[fast], ends[fast], np.maximum(held_ends[fast], ends[fast]))
+        instrumentation.count("bytes_copied", 2 * starts[fast].nbytes)
+        for i in np.flatnonzero(~fast):
+            self._set(slots[i], self._get(slots[i]).union(IntervalSet(starts[i:i + 1], ends[i:i + 1])))
+
+    def remove_intervals(self, features: List[str], starts: np.ndarray, ends: np.ndarray):
+        """Removes one interval per entry from the features in place, ignoring features not held."""
+        held = [i for i, feature in enumerate(features) if feature in self._slots]
+        slots = np.array([self._slots[features[i]] for i in held], dtype=np.int64)
+        starts = np.asarray(starts, dtype="datetime64[D]")[held]
+        ends = np.asarray(ends, dtype="datetime64[D]")[held]
+        held_starts, held_ends = self._starts[slots], self._ends[slots]
+        overlap = (starts < held_ends) & (held_starts < ends) & (held_starts < held_ends) & (starts < ends)
+        inner = (held_starts < starts) & (ends < held_ends)
+        fast = overlap & ~inner & self._single(slots)
+        if not overlap.any():
+            return
+        self._writable()
+        left = starts[fast] <= held_starts[fast]
+        self._starts[slots[fast]] = np.where(left, ends[fast], held_starts[fast])
+        self._ends[slots[fast]] = np.where(left, held_ends[fast], starts[fast])
+        for i in np.flatnonzero(overlap & ~fast):
+            self._set(slots[i], self._get(slots[i]).difference(IntervalSet(starts[i:i + 1], ends[i:i + 1])))
+
+    def count(self) -> int:
+        """Returns the amount of days held over all features."""
+        starts, ends = self.arrays
+        single = np.maximum((ends - starts).astype(np.int64), 0)
+        if self._split:
+            single[list(self._split)] = 0
+        return int(single.sum()) + sum(intervals.count() for intervals in self._split.values())
+
+    def held_intervals(self, feature: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the first and last days of all held intervals of a feature."""
+        intervals = self.get(feature, IntervalSet())
+        return intervals.starts, intervals.ends - 1
+
+    def observations(self, feature: str) -> int:
+        """Returns the amount of days held of a feature in O(1) for features held in a single interval."""
+        slot = self._slots.get(feature)
+        if slot is None:
+            return 0
+        intervals = self._split.get(slot)
+        if intervals is not None:
+            return intervals.count()
+        return max(int((self._ends[slot] - self._starts[slot]).astype(np.int64)), 0)
+
+    def to_daily_series(self,
+                        start: Union[date, str] = None,
+                        end: Union[date, str] = None,
+                        features: [str] = None) -> DailySeries:
+        """Returns a dense view of the held days."""
+        start = start if start else self.earliest
+        end = end if end else self.latest
+        features = features if features else self.columns
+        index = pd.date_range(start=start, end=end, freq="1D")
+        data = np.array([self.get(f, IntervalSet()).contains(index.values) for f in features]).T
+        return DailySeries(data=data.reshape(len(index), len(features)), columns=features, index=index,
+                           dtype=np.int8)
+
+    def get(self, feature: str, default: IntervalSet = None) -> Optional[IntervalSet]:
+        slot = self._slots.get(feature)
+        return default if slot is None else self._get(slot)
+
+    def _get(self, slot: int) -> IntervalSet:
+        intervals = self._split.get(slot)
+        if intervals is not None:
+            return intervals
+        return IntervalSet(self._starts[slot:slot + 1].copy(), self._ends[slot:slot + 1].copy())
+
+    def _set(self, slot: int, intervals: IntervalSet):
+        self._writable()
+        if len(intervals) > 1:
+            self._split[slot] = intervals
+            self._starts[slot], self._ends[slot] = intervals.starts[0], intervals.ends[-1]
+            return
+        self._split.pop(slot, None)
+        self._starts[slot], self._ends[slot] = (intervals.starts[0], intervals.ends[0]) if len(intervals) \
+            else (np.datetime64(0, "D"), np.datetime64(0, "D"))
+
+    def _allocate(self, features: List[str]) -> np.ndarray:
+        """Returns the slots of the features, adding empty ones for features not held yet."""
+        if not self._slots:
+            added = list(dict.fromkeys(features))
+        else:
+            added = list(dict.fromkeys(feature for feature in features if feature not in self._slots))
+        if added:
+            first, last = len(self._features), len(self._features) + len(added)
+            self._slots.update(zip(added, range(first, last)))
+            self._features.extend(added)
+            if last > len(self._starts):
+                self._grow(max(2 * len(self._starts), last, 4))
+            else:
+                self._writable()
+            self._starts[first:last] = self._ends[first:last] = np.datetime64(0, "D")
+            if len(added) == len(features):
+                return np.arange(first, last)
+        return np.array([self._slots[feature] for feature in features], dtype=np.int64)
+
+    def _grow(self, capacity: int):
+        starts = np.zeros(capacity, dtype="datetime64[D]")
+        ends = np.zeros(capacity, dtype="datetime64[D]")
+        starts[:len(self._starts)], ends[:len(self._ends)] = self._starts, self._ends
+        if self._shared:
+            self._split = dict(self._split)
+        self._starts, self._ends, self._shared = starts, ends, False
+        self._bounds = None
+        instrumentation.count("bytes_copied", 2 * self._starts.nbytes)
+
+    def _writable(self):
+        """Prepares the arrays for a write, copying them if they are shared."""
+        self._bounds = None
+        if self._shared:
+            self._starts, self._ends, self._split = self._starts.copy(), self._ends.copy(), dict(self._split)
+            self._shared = False
+            instrumentation.count("bytes_copied", 2 * self._starts.nbytes)
+
+    def _single(self, slots: np.ndarray) -> np.ndarray:
+        """Returns whether every slot occurs only once and holds at most a single interval, i.e. whether it can be
+        updated in the vectorized path."""
+        listed = slots.tolist()
+        if len(set(listed)) == len(listed):
+            single = np.ones(len(slots), dtype=bool)
+        else:
+            _, inverse, counts = np.unique(slots, return_inverse=True, return_counts=True)
+            single = counts[inverse] == 1
+        if self._split:
+            single &= np.fromiter((slot not in self._split for slot in listed), dtype=bool, count=len(listed))
+        return single
+
+    def __getitem__(self, feature: str) -> IntervalSet:
+        return self._get(self._slots[feature])
+
+    def __setitem__(self, feature: str, intervals: IntervalSet):
+        self._set(int(self._allocate([feature])[0]), intervals)
+
+    def __delitem__(self, feature: str):
+        """Removes a feature by moving the feature of the last slot into its slot."""
+        self._writable()
+        slot, last = self._slots.pop(feature), len(self._slots)
+        self._split.pop(slot, None)
+        moved = self._features.pop()
+        if slot != last:
+            self._slots[moved], self._features[slot] = slot, moved
+            self._starts[slot], self._ends[slot] = self._starts[last], self._ends[last]
+            if last in self._split:
+                self._split[slot] = self._split.pop(last)
+
+    def __contains__(self, feature: str) -> bool:
+        return feature in self._slots
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __copy__(self) -> "IntervalSeries":
+        series = IntervalSeries()
+        series._slots, series._features, series._split = dict(self._slots), list(self._features), self._split
+        series._starts, series._ends, series._bounds = self._starts, self._ends, self._bounds
+        series._shared = self._shared = True
+        return series
+
+    def __add__(self, other) -> "IntervalSeries":
+        series = self.__copy__()
+        series.add(other)
+        return series
+
+
 def create_daily_series(
         columns: List[str],
         empty: bool = False,
@@ -0,0 +1,108 @@
+import functools
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from datetime import date
+from typing import Dict, List, Any, Iterator, Optional, Callable
+
+
+class Phase:
+    """Context manager adding its wall time to a phase of the instrumentation."""
+
+    def __init__(self, instrumentation: "Instrumentation", name: str):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.instrumentation.phases.append(self.name)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.instrumentation.seconds[self.name] += time.perf_counter() - self.started
+        self.instrumentation.phases.pop()
+        return False
+
+
+_DISABLED = nullcontext()
+
+
+class Instrumentation:
+    """Counters and phase timers of the hot paths. Disabled by default, in which case call sites only pay for checking
+    `enabled`. Reports are closed at every tick and cover everything since the previous tick."""
+    enabled: bool
+    counters: Dict[str, int]
+    seconds: Dict[str, float]
+    phases: List[str]
+    reports: List[Dict[str, Any]]
+
+    def __init__(self):
+        self.enabled = False
+        self.phases = []
+        self.reports = []
+        self.reset()
+
+    def reset(self):
+        self.counters = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def count(self, name: str, amount: int = 1):
+        if self.enabled:
+            self.counters[name] += amount
+
+    def phase(self, name: str):
+        """Returns a context manager timing a phase, nesting phases is allowed."""
+        return Phase(self, name) if self.enabled else _DISABLED
+
+    @property
+    def current_phase(self) -> Optional[str]:
+        """The innermost running phase, e.g. for a sampling profiler to attribute its samples to."""
+        return self.phases[-1] if self.phases else None
+
+    def close_report(self, day: date):
+        """Stores the counters and timings collected so far as the report of given day and starts a new one."""
+        self.reports.append({"date": str(day), "counters": dict(self.counters), "seconds": dict(self.seconds)})
+        self.reset()
+
+    def totals(self) -> Dict[str, Any]:
+        """Returns the sums over all reports, including the unclosed one."""
+        counters, seconds = defaultdict(int), defaultdict(float)
+        for report in self.reports + [{"counters": self.counters, "seconds": self.seconds}]:
+            for name, value in report["counters"].items():
+                counters[name] += value
+            for name, value in report["seconds"].items():
+                seconds[name] += value
+        return {"counters": dict(counters), "seconds": dict(seconds)}
+
+    def dump(self, path: str):
+        with open(path, "w") as file:
+            json.dump({"reports": self.reports, "totals": self.totals()}, file, indent=2)
+
+
+instrumentation = Instrumentation()
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """Decorator timing every call of a function as a phase."""
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return function(*args, **kwargs)
+            with Phase(instrumentation, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def instrumented() -> Iterator[Instrumentation]:
+    """Enables the instrumentation with fresh reports for the duration of the context."""
+    instrumentation.reports = []
+    instrumentation.reset()
+    instrumentation.enabled = True
+    try:
+        yield instrumentation
+    finally:
+        instrumentation.enabled = False
@@ -0,0 +1,99 @@
+import glob
+import os
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from .network import Network, NetworkListener
+
+COLUMNS: Dict[str, str] = {
+    "date": "datetime64[D]",
+    "nodes": "int64",
+    "tree_depth": "int64",
+    "min_observed": "float64",
+    "mean_observed": "float64",
+    "max_observed": "float64",
+    "min_copies": "int64",
+    "mean_copies": "float64",
+    "max_copies": "int64",
+    "transferred_cells": "int64",
+}
+
+
+class MetricsRecorder(NetworkListener):
+    """Appends one row of metrics of a dataset per tick to a preallocated columnar buffer, which is flushed to an
+    append-only chunk file in `path` whenever it is full. Memory stays bounded by `batch` rows regardless of the length
+    of the run."""
+    path: str
+    dataset: str
+    batch: int
+    columns: Dict[str, np.ndarray]
+    rows: int
+    chunks: int
+    _transferred: int
+
+    def __init__(self, path: str, dataset: str, batch: int = 4096):
+        self.path = path
+        self.dataset = dataset
+        self.batch = batch
+        self.columns = {name: np.empty(batch, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.rows = 0
+        os.makedirs(path, exist_ok=True)
+        self.chunks = len(glob.glob(os.path.join(path, "metrics-*.npz")))
+        self._transferred = 0
+
+    def attach(self, net: Network) -> "MetricsRecorder":
+        net.listeners.append(self)
+        return self
+
+    def on_distribute(self, net: Network, dataset: str, transferred: int):
+        if dataset == self.dataset:
+            self._transferred += transferred
+
+    def on_tick(self, net: Network):
+        self.record(net)
+
+    def record(self, net: Network):
+        """Appends the current metrics of the network as a row."""
+        obs = net.observations(self.dataset)
+        copies = net.dataset_copies(self.dataset)
+        row = self.rows
+        self.columns["date"][row] = np.datetime64(net.current_date, "D")
+        self.columns["nodes"][row] = len(net.nodes)
+        self.columns["tree_depth"][row] = net.tree_depth
+        self.columns["min_observed"][row] = obs.min()
+        self.columns["mean_observed"][row] = obs.mean()
+        self.columns["max_observed"][row] = obs.max()
+        self.columns["min_copies"][row] = copies.min()
+        self.columns["mean_copies"][row] = copies.mean()
+        self.columns["max_copies"][row] = copies.max()
+        self.columns["transferred_cells"][row] = self._transferred
+        self._transferred = 0
+        self.rows += 1
+        if self.rows == self.batch:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered rows to a new chunk file."""
+        if self.rows == 0:
+            return
+        np.savez(os.path.join(self.path, f"metrics-{self.chunks:06d}.npz"),
+                 **{name: values[:self.rows] for name, values in self.columns.items()})
+        self.chunks += 1
+        self.rows = 0
+
+    def close(self, net: Network = None):
+        """Detaches the recorder from the network and flushes the remaining rows."""
+        if net is not None and self in net.listeners:
+            net.listeners.remove(self)
+        self.flush()
+
+
+def load_metrics(path: str) -> pd.DataFrame:
+    """Reads all chunks written by a MetricsRecorder in order."""
+    frames = []
+    for chunk in sorted(glob.glob(os.path.join(path, "metrics-*.npz"))):
+        with np.load(chunk) as columns:
+            frames.append(pd.DataFrame({name: columns[name] for name in columns.files}))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(COLUMNS))
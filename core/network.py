@@ -1,5 +1,7 @@
+import sys
+from copy import copy
 from enum import Enum
-from typing import OrderedDict, Union, Dict, List, Tuple, Optional
+from typing import OrderedDict, Union, Dict, List, Tuple, Optional, TextIO, Iterator
 
 import numpy as np
 import pandas as pd
@@ -7,9 +9,14 @@ from numpy import datetime64
 from datetime import datetime, date, timedelta
 
 from .config import config
-from .data import DailySeries, create_daily_series
+from .data import DailySeries, IntervalSet, IntervalSeries, create_daily_series
+from .aggregates import NetworkAggregates, ObservationIndex
+from .assignment import IntervalAssignment
+from .instrumentation import instrumentation, timed
 from .node import Node
-from .tree import IntervalTreeNode, build_ordered, build_balanced
+from .render import bucket, bucket_labels, write_rows, write_heatmap
+from .tree import IntervalTreeNode, build_ordered, build_balanced, insert_balanced, remove_balanced, ordered_ranks, \
+    ordered_index, encode_tree, decode_tree
 
 
 class TreeType(Enum):
@@ -18,6 +25,56 @@ class TreeType(Enum):
     balanced_rtol = 3  # shallowest branch first from right to left
     balanced_ltor = 4  # shallowest branch first from left to right
     balanced_random = 5  # shallowest branch first, randomly chosen direction
+    churn_aware = 6  # splits and merges neighbouring intervals on joins and leaves
+
+
+ORDERED_DIRECTIONS: Dict[TreeType, str] = {
+    TreeType.ordered_rtol: "rtol",
+    TreeType.ordered_ltor: "ltor",
+}
+BALANCED_DIRECTIONS: Dict[TreeType, str] = {
+    TreeType.balanced_rtol: "rtol",
+    TreeType.balanced_ltor: "ltor",
+    TreeType.balanced_random: "random",
+    TreeType.churn_aware: "ltor",  # only shapes the tree, intervals are taken from the IntervalAssignment
+}
+
+
+class NetworkListener:
+    """Receives callbacks from a Network it was added to via `listeners`."""
+
+    def on_tick(self, net: "Network"):
+        pass
+
+    def on_distribute(self, net: "Network", dataset: str, transferred: int):
+        pass
+
+
+Delivery = Tuple[str, List[str], np.ndarray, np.ndarray]  # receiver, and one interval per entry of features
+
+
+class Transport:
+    """Delivers the slices of a distribution to the receiving nodes, by calling them directly by default."""
+
+    def deliver(self, net: "Network", deliveries: List[Delivery]):
+        for name, features, starts, ends in deliveries:
+            net.nodes[name].receive_intervals(features, starts, ends)
+
+
+def group_by_node(batches: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]],
+                  names: List[str],
+                  datasets: np.ndarray) -> Iterator[Delivery]:
+    """Regroups batches of (node positions, dataset positions, starts, ends) by node."""
+    if not batches:
+        return
+    nodes, indices, starts, ends = (np.concatenate(column) for column in zip(*batches))
+    if len(nodes) == 0:
+        return
+    order = np.argsort(nodes, kind="stable")
+    nodes, indices, starts, ends = nodes[order], indices[order], starts[order], ends[order]
+    bounds = np.flatnonzero(np.diff(nodes)) + 1
+    for first, last in zip(np.r_[0, bounds], np.r_[bounds, len(nodes)]):
+        yield names[nodes[first]], list(datasets[indices[first:last]]), starts[first:last], ends[first:last]
 
 
 class Network:
@@ -28,8 +85,17 @@ class Network:
     current_date: date
     owner_lookup: Dict[str, Node]
     tree_type: TreeType
+    moved_cells: List[Tuple[str, int]]
+    listeners: List[NetworkListener]
+    transport: Transport
 
     _tree: Optional[IntervalTreeNode]
+    _tree_nodes: Dict[str, IntervalTreeNode]
+    _heap: Optional[List[str]]
+    _assignments: Dict[str, IntervalSeries]  # the intervals of every dataset assigned to the nodes, keyed by node
+    _interval_assignment: IntervalAssignment
+    _aggregates: NetworkAggregates
+    _observations: ObservationIndex
 
     def __init__(self,
                  start_date: Union[str, datetime64, datetime, date] = datetime.now(),
@@ -41,18 +107,74 @@ class Network:
         self.tree_type = tree_type
         self.nodes = OrderedDict[str, Node]()
         self.owner_lookup = {}
+        self._tree = None
+        self._tree_nodes = {}
+        self._heap = None
+        self._assignments = {}
+        self._interval_assignment = IntervalAssignment()
+        self._aggregates = NetworkAggregates()
+        self._observations = ObservationIndex()
+        self.moved_cells = []
+        self.listeners = []
+        self.transport = Transport()
 
+    def save(self, path: str):
+        """Writes a snapshot of the network to a directory, see core.snapshot."""
+        from .snapshot import save_network
+        save_network(self, path)
+
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> "Network":
+        """Reads a snapshot written by save, memory-mapping its arrays unless `mmap` is False."""
+        from .snapshot import load_network
+        return load_network(path, mmap)
+
+    def fork(self) -> "Network":
+        """Returns an independent copy of the network for what-if scenarios. Observations and intervals are shared
+        with this network until either side changes them, so forking costs O(nodes) regardless of the amount of
+        data. Listeners and the transport are not copied."""
+        net = Network(self.start_date, self.current_date, self.tree_type)
+        net.nodes_created = self.nodes_created
+        for name, node in self.nodes.items():
+            net.nodes[name] = copy(node)
+            net.node_changed(name)
+        net.owner_lookup = {dataset: net.nodes[node.name] for dataset, node in self.owner_lookup.items()}
+        net._assignments = {dataset: copy(assignments) for dataset, assignments in self._assignments.items()}
+        net._interval_assignment.names = list(self._interval_assignment.names)
+        net._interval_assignment.widths = list(self._interval_assignment.widths)
+        net.moved_cells = list(self.moved_cells)
+        if self.tree_type not in ORDERED_DIRECTIONS:
+            net._tree = decode_tree(*encode_tree(self._tree))
+            net._tree_nodes = {} if net._tree is None else {tree_node.value: tree_node for tree_node in net._tree}
+        return net
+
+    @timed("tree.rebuild")
     def generate_tree(self):
-        if self.tree_type == TreeType.ordered_rtol:
-            self._tree = build_ordered(self.nodes.keys(), "rtol")
-        elif self.tree_type == TreeType.ordered_ltor:
-            self._tree = build_ordered(self.nodes.keys(), "ltor")
-        elif self.tree_type == TreeType.balanced_rtol:
-            self._tree = build_balanced(self.nodes.keys(), "rtol")
-        elif self.tree_type == TreeType.balanced_ltor:
-            self._tree = build_balanced(self.nodes.keys(), "ltor")
-        elif self.tree_type == TreeType.balanced_random:
-            self._tree = build_balanced(self.nodes.keys(), "random")  # TODO: Lock in previous choices
+        if self.tree_type in ORDERED_DIRECTIONS:
+            self._tree = build_ordered(self.nodes.keys(), ORDERED_DIRECTIONS[self.tree_type])
+        else:
+            self._tree = build_balanced(self.nodes.keys(), BALANCED_DIRECTIONS[self.tree_type])
+        self._tree_nodes = {} if self._tree is None else {tree_node.value: tree_node for tree_node in self._tree}
+
+    @timed("tree.update")
+    def insert_into_tree(self, name: str):
+        """Places a node into the tree. Balanced trees are updated in O(log N) and keep all previous placements.
+        Ordered trees are implicit heaps over the node order and only get built when accessed through `tree`."""
+        if self.tree_type in ORDERED_DIRECTIONS:
+            self._tree = None
+            self._heap = None
+            return
+        tree_node = IntervalTreeNode(name)
+        self._tree = insert_balanced(self._tree, tree_node, BALANCED_DIRECTIONS[self.tree_type])
+        self._tree_nodes[name] = tree_node
+
+    @timed("tree.update")
+    def remove_from_tree(self, name: str):
+        if self.tree_type in ORDERED_DIRECTIONS:
+            self._tree = None
+            self._heap = None
+            return
+        self._tree = remove_balanced(self._tree, self._tree_nodes.pop(name))
 
     @property
     def tree(self) -> IntervalTreeNode:
@@ -60,29 +182,43 @@ class Network:
             self.generate_tree()
         return self._tree
 
+    @property
+    def tree_depth(self) -> int:
+        if self.tree_type in ORDERED_DIRECTIONS:
+            return max(len(self.nodes).bit_length() - 1, 0)
+        return self.tree.height if self.tree is not None else 0
+
     @property
     def earliest(self) -> date:
-        np_datetime = np.min(np.array([node.earliest for node in self.nodes.values()], dtype=datetime64))
-        return pd.to_datetime(np_datetime).date()
+        return self._aggregates.earliest
 
     @property
     def latest(self) -> date:
-        np_datetime = np.max(np.array([node.latest for node in self.nodes.values()], dtype=datetime64))
-        np_datetime = pd.to_datetime(np_datetime).date()
-        if np_datetime > self.current_date:
+        latest = self._aggregates.latest
+        if latest > self.current_date:
             return self.current_date
         else:
-            return np_datetime
+            return latest
+
+    def node_changed(self, node: str):
+        """Updates the network-wide aggregates after the data of a node was changed from outside the network."""
+        self._aggregates.update(self.nodes[node])
+        self._observations.update(self.nodes[node])
 
     def observations(self, dataset: str) -> np.ndarray:
-        return np.array([node.observations(dataset) for node in self.nodes.values()])
+        """Returns the amount of received days of a dataset for every node, in the order of `nodes`."""
+        return self._observations.observations(dataset)
 
     def add_node(self, node: Node):
         self.nodes[node.name] = node
+        self._aggregates.update(node)
+        self._observations.update(node)
         for dataset in node.own_data.columns:
             assert self.owner_lookup.get(dataset) is None
             self.owner_lookup[dataset] = node
-        self.generate_tree()
+        self.insert_into_tree(node.name)
+        if self.tree_type == TreeType.churn_aware:
+            self.record_move(node.name, *self._interval_assignment.join(node.name))
 
     def add_nodes(self, nodes: [Node]):
         for node in nodes:
@@ -110,22 +246,95 @@ class Network:
         self.add_nodes(nodes)
         return nodes
 
+    def add_datasets(self, node: str, features_cnt: int, start: Union[datetime, date, str] = None):
+        """Lets a node start collecting new own datasets"""
+        owner = self.nodes[node]
+        start = self.current_date if start is None else start
+        offset = len(owner.own_data.columns) if owner.own_data is not None else 0
+        columns = [f"{owner.name}-{offset + k + 1}" for k in range(features_cnt)]
+        for dataset in columns:
+            assert self.owner_lookup.get(dataset) is None
+            self.owner_lookup[dataset] = owner
+        owner.add_own_data(create_daily_series(columns=columns, start=start, end=start))
+        self._aggregates.update(owner)
+
     def remove_node(self, node: str):
-        del self.nodes[node]
-        self.generate_tree()
+        self._aggregates.remove(node)
+        self._observations.remove(node)
+        for dataset in self.nodes.pop(node).own_data.columns:
+            del self.owner_lookup[dataset]
+            self._assignments.pop(dataset, None)
+        self.remove_from_tree(node)
+        for assignments in self._assignments.values():
+            if node in assignments:
+                del assignments[node]
+        if self.tree_type == TreeType.churn_aware:
+            self.record_move(node, *self._interval_assignment.leave(node))
+
+    def record_move(self, node: str, start: float, end: float):
+        """Records the day-cells of all distributed datasets which move because of a membership change of a node,
+        given the affected share of the span. Only the days a dataset actually holds within that share are counted."""
+        first, last = self.fraction_dates(np.array([start, end])) if self.nodes else (None, None)
+        if not self._assignments or first is None or last.floor("D") < first.ceil("D"):
+            self.moved_cells.append((node, 0))
+            return
+        first = np.datetime64(first.ceil("D").date(), "D")
+        last = np.datetime64(last.floor("D").date(), "D") + 1
+        cells = sum(self.owner_lookup[dataset].own_data.held_intervals(dataset).clip(first, last).count()
+                    for dataset in self._assignments)
+        self.moved_cells.append((node, int(cells)))
 
-    def tick(self):
-        self.current_date += timedelta(1)
+    def fraction_dates(self, fractions: np.ndarray) -> pd.DatetimeIndex:
+        """Maps fractions of the span between earliest and latest to timestamps"""
+        first, last = pd.Timestamp(self.earliest).value, pd.Timestamp(self.latest).value
+        return pd.to_datetime(first + np.round(fractions * (last - first)).astype(np.int64))
+
+    @timed("tick")
+    def tick(self, days: int = 1):
+        """Advances the network by given amount of days, in which every node observes its own data once per day. Closes
+        the instrumentation report of the previous day."""
+        if instrumentation.enabled:
+            instrumentation.close_report(self.current_date)
+        self.current_date += timedelta(days)
         for node in self.nodes.values():
-            node.tick(self.current_date)
+            node.tick(self.current_date, days)
+            self._aggregates.update(node)
+        for listener in self.listeners:
+            listener.on_tick(self)
+
+    def interval_ranks(self) -> np.ndarray:
+        """Returns the position of every node's interval within the dataset, in the order of `nodes`"""
+        if self.tree_type in ORDERED_DIRECTIONS:
+            return ordered_ranks(len(self.nodes), ORDERED_DIRECTIONS[self.tree_type])
+        if self.tree_type == TreeType.churn_aware:
+            ranks = {name: i for i, name in enumerate(self._interval_assignment.names)}
+        else:
+            ranks = {tree_node.value: i for i, tree_node in enumerate(self.tree.left_to_right)}
+        return np.array([ranks[name] for name in self.nodes], dtype=np.int64)
+
+    def rank_owner(self, rank: int) -> str:
+        """Returns the name of the node assigned to the interval at the given position"""
+        if self.tree_type in ORDERED_DIRECTIONS:
+            if self._heap is None:
+                self._heap = list(self.nodes)
+            return self._heap[ordered_index(rank, len(self._heap), ORDERED_DIRECTIONS[self.tree_type])]
+        if self.tree_type == TreeType.churn_aware:
+            return self._interval_assignment.names[rank]
+        return self.tree.select(rank).value
 
+    @timed("get_intervals")
     def get_intervals(self) -> Dict[str, Tuple[datetime, datetime]]:
         """Returns a datetime interval to be assigned to every node"""
         # TODO: Maybe distribute newer data more thinly than older data?
         intervals: (datetime, datetime) = {}
+        if self.tree_type == TreeType.churn_aware:
+            date_range = self.fraction_dates(self._interval_assignment.bounds())
+            for i, name in enumerate(self._interval_assignment.names):
+                intervals[name] = (date_range[i], date_range[i + 1])
+            return intervals
         date_range = pd.date_range(self.earliest, self.latest, len(self.nodes) + 1)
-        for i, node in enumerate(self.tree.left_to_right):
-            intervals[node.value] = (date_range[i], date_range[i + 1])
+        for name, rank in zip(self.nodes, self.interval_ranks()):
+            intervals[name] = (date_range[rank], date_range[rank + 1])
         return intervals
 
     def get_daily_series(self, dataset: str) -> Optional[DailySeries]:
@@ -134,78 +343,277 @@ class Network:
             return node.own_data[dataset]
         return None
 
+    def dataset_span(self, dataset: str) -> Tuple[date, date]:
+        """Returns the first and last day of a dataset without materializing it"""
+        own_data = self.owner_lookup[dataset].own_data
+        held = own_data.held_intervals(dataset)
+        if len(held) == 0:
+            return own_data.earliest, own_data.earliest + timedelta(len(own_data) - 1)
+        return held.earliest, held.latest
+
     def get_all_dataset_names(self) -> List[str]:
         return list(set(self.owner_lookup.keys()))
 
-    def get_dataset_copies(self, dataset: str) -> pd.DataFrame:
-        """Returns a DataFrame with the amount of copies of a single slice for all slices of given dataset"""
-        df = next(iter(self.nodes.values())).received_data[dataset]
-        empty = df.copy()
-        empty.values[:] = 0
-        for node in list(self.nodes.values())[1:]:
-            if node.received_data is not None:
-                df = pd.concat([df, node.received_data[dataset]], axis=1).fillna(0)
+    def distributed_datasets(self) -> List[str]:
+        """Returns the datasets distributed so far"""
+        return list(self._assignments.keys())
+
+    def held_intervals(self, dataset: str, exclude_owner: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns starts, exclusive ends and holder positions (within `nodes`) of all intervals of given dataset held
+        by the nodes, as day offsets from the dataset's earliest day, clipped to the dataset"""
+        earliest, latest = self.dataset_span(dataset)
+        owner = self.owner_lookup[dataset]
+        first = np.datetime64(earliest, "D")
+        days = (latest - earliest).days + 1
+        starts, ends, holders = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)], \
+            [np.empty(0, dtype=np.int64)]
+        for i, node in enumerate(self.nodes.values()):
+            if exclude_owner and node is owner:
+                continue
+            if node.received_data is not None and dataset in node.received_data.columns:
+                node_starts, node_ends = node.received_data.held_intervals(dataset)
+                starts.append((node_starts - first).astype(np.int64))
+                ends.append((node_ends - first).astype(np.int64))
+                holders.append(np.full(len(node_starts), i, dtype=np.int64))
+        starts = np.clip(np.concatenate(starts), 0, days)
+        ends = np.clip(np.concatenate(ends) + 1, 0, days)
+        return starts, ends, np.concatenate(holders)
+
+    def dataset_copies(self, dataset: str, exclude_owner: bool = False) -> np.ndarray:
+        """Returns the amount of copies of every day of given dataset in O(nodes + days), by summing up a difference
+        array over the intervals held by all nodes"""
+        earliest, latest = self.dataset_span(dataset)
+        days = (latest - earliest).days + 1
+        starts, ends, _ = self.held_intervals(dataset, exclude_owner)
+        diff = np.zeros(days + 1, dtype=np.int64)
+        np.add.at(diff, starts, 1)
+        np.add.at(diff, ends, -1)
+        return np.cumsum(diff[:-1])
+
+    def k_coverage(self, dataset: str) -> int:
+        """Returns the smallest amount of nodes besides the owner whose removal makes the dataset unreconstructable,
+        which is the amount of copies of the least replicated day"""
+        return int(self.dataset_copies(dataset, exclude_owner=True).min())
+
+    def minimal_cover(self, dataset: str, max_nodes: int = None) -> Optional[List[str]]:
+        """Returns a minimal set of nodes besides the owner which together hold every day of given dataset, or None
+        if the network cannot reconstruct it.
+
+        If every node holds a single contiguous interval, the greedy interval cover is optimal and runs in
+        O(N log N). Otherwise, the greedy set cover heuristic picks the node adding most missing days until the
+        dataset is covered or `max_nodes` were picked."""
+        earliest, latest = self.dataset_span(dataset)
+        days = (latest - earliest).days + 1
+        starts, ends, holders = self.held_intervals(dataset, exclude_owner=True)
+        names = list(self.nodes)
+        if len(np.unique(holders)) < len(holders):
+            return self._set_cover(starts, ends, holders, days, max_nodes)
+
+        order = np.argsort(starts, kind="stable")
+        starts, ends, holders = starts[order], ends[order], holders[order]
+        reach = np.maximum.accumulate(ends) if len(ends) else ends
+        reacher = np.maximum.accumulate(np.where(ends == reach, np.arange(len(ends)), 0))
+        cover: List[str] = []
+        covered = 0
+        while covered < days:
+            last = np.searchsorted(starts, covered, side="right") - 1
+            if last < 0 or reach[last] <= covered or (max_nodes is not None and len(cover) == max_nodes):
+                return None
+            cover.append(names[holders[reacher[last]]])
+            covered = reach[last]
+        return cover
+
+    def _set_cover(self,
+                   starts: np.ndarray,
+                   ends: np.ndarray,
+                   holders: np.ndarray,
+                   days: int,
+                   max_nodes: int = None) -> Optional[List[str]]:
+        first = np.datetime64(0, "D")
+        candidates: Dict[int, IntervalSet] = {}
+        for holder in np.unique(holders):
+            held = holders == holder
+            candidates[holder] = IntervalSet(first + starts[held], first + ends[held])
+        missing = IntervalSet(np.array([first]), np.array([first + days]))
+        names = list(self.nodes)
+        cover: List[str] = []
+        while len(missing):
+            if max_nodes is not None and len(cover) == max_nodes:
+                return None
+            gains = {holder: held.intersection(missing).count() for holder, held in candidates.items()}
+            best = max(gains, key=gains.__getitem__, default=None)
+            if best is None or gains[best] == 0:
+                return None
+            cover.append(names[best])
+            missing = missing.difference(candidates.pop(best))
+            candidates = {holder: held for holder, held in candidates.items() if gains[holder] > 0}
+        return cover
+
+    @timed("reporting")
+    def get_dataset_copies(self, dataset: str) -> pd.Series:
+        """Returns the amount of copies of a single slice for all slices of given dataset"""
+        earliest, latest = self.dataset_span(dataset)
+        return pd.Series(self.dataset_copies(dataset), index=pd.date_range(start=earliest, end=latest, freq="1D"))
+
+    def distribute_series(self, dataset: str, delta: bool = False, evict: bool = False) -> int:
+        """Distributes slices of a dataset and returns the amount of transferred day-cells. With `delta`, nodes only
+        receive the days which were not already assigned to them by the previous distribution. With `evict`, nodes
+        drop the days which are no longer assigned to them."""
+        return self.distribute_datasets([dataset], delta, evict)[dataset]
+
+    @timed("distribute_series")
+    def distribute_datasets(self, datasets: List[str] = None, delta: bool = False,
+                            evict: bool = False) -> Dict[str, int]:
+        """Distributes several datasets, all owned ones by default, in one pass and returns the amount of transferred
+        day-cells per dataset. The node intervals are computed once for all datasets and every node receives the
+        slices of all datasets in a single batch. See distribute_series for `delta` and `evict`."""
+        datasets = list(self.owner_lookup) if datasets is None else datasets
+        intervals = self.get_intervals()
+        names = list(intervals.keys())
+        starts = pd.DatetimeIndex([start for start, _ in intervals.values()]).ceil("D").values.astype("datetime64[D]")
+        ends = pd.DatetimeIndex([end for _, end in intervals.values()]).floor("D").values.astype("datetime64[D]") + 1
+        position = {name: i for i, name in enumerate(names)}
+        transferred: Dict[str, int] = {}
+        received, evicted = [], []
+        for i, dataset in enumerate(datasets):
+            held = self.owner_lookup[dataset].own_data.held_intervals(dataset)
+            if len(held) > 1:
+                assigned = IntervalSeries({name: held.clip(start, end) for name, start, end in zip(names, starts, ends)})
+            elif len(held) == 1:
+                assigned = IntervalSeries.from_intervals(names, np.maximum(starts, held.starts[0]),
+                                                         np.minimum(ends, held.ends[0]))
             else:
-                df = pd.concat([df, empty], axis=1).fillna(0)
-        df.applymap(lambda x: np.maximum(x, 1))
-        df = df.div(df)
-        df = df.fillna(0)
-        return df.sum(axis=1)
-
-    def distribute_series(self, dataset: str):
-        """Distributes slices of a dataset"""
-        timeseries = self.get_daily_series(dataset)
-        for receiver, (start, end) in self.get_intervals().items():
-            self.nodes[receiver].receive_data(timeseries[start:end])
+                assigned = IntervalSeries.from_intervals(names, starts, starts)
+            previous = self._assignments.get(dataset)
+            sent = assigned
+            if delta and previous is not None:
+                sent = copy(assigned)
+                sent.remove(previous)
+            transferred[dataset] = sent.count()
+            receivers, sent_starts, sent_ends = sent.intervals()
+            receivers = np.array([position[name] for name in receivers], dtype=np.int64)
+            # receivers without sent days get an empty interval, so they hold the dataset nonetheless
+            empty = np.ones(len(names), dtype=bool)
+            empty[receivers] = False
+            received.append((np.concatenate([receivers, np.flatnonzero(empty)]),
+                             np.full(len(receivers) + int(empty.sum()), i),
+                             np.concatenate([sent_starts, starts[empty]]),
+                             np.concatenate([sent_ends, starts[empty]])))
+            if evict and previous is not None:
+                dropped = copy(previous)
+                dropped.remove(assigned)
+                holders, dropped_starts, dropped_ends = dropped.intervals()
+                evicted.append((np.array([position[name] for name in holders], dtype=np.int64),
+                                np.full(len(holders), i), dropped_starts, dropped_ends))
+            self._assignments[dataset] = assigned
+
+        datasets = np.array(datasets, dtype=object)
+        deliveries = list(group_by_node(received, names, datasets))
+        self.transport.deliver(self, deliveries)
+        for name, features, batch_starts, batch_ends in group_by_node(evicted, names, datasets):
+            self.nodes[name].evict_intervals(features, batch_starts, batch_ends)
+            self._aggregates.update(self.nodes[name])
+            self._observations.update(self.nodes[name])
+        for name, *_ in deliveries:
+            self._aggregates.update(self.nodes[name])
+            self._observations.update(self.nodes[name])
+        for listener in self.listeners:
+            for dataset, cells in transferred.items():
+                listener.on_distribute(self, dataset, cells)
+        return transferred
 
     def allocate_dataframes(self, start: date, end: date):
         for node in self.nodes.values():
-            node.received_data.extend_to_date(start, end, inplace=True)
-            node.own_data.extend_to_date(start, end, inplace=True)
+            node.own_data.reserve(end)
 
     def print_nodes(self):
         for node in self.nodes.values():
             print(node)
 
-    def print_dataset_intervals(self, dataset: str):
-        series = self.get_daily_series(dataset)
+    def coverage_matrix(self, dataset: str) -> Tuple[List[str], np.ndarray]:
+        """Returns the names of all nodes which received data and a matrix of codes with a row per such node and a
+        column per day of given dataset: 0 if the node does not hold the day, 1 if it holds it and 2 if it holds it
+        within its currently assigned interval"""
+        earliest, latest = self.dataset_span(dataset)
+        first = np.datetime64(earliest, "D")
+        days = (latest - earliest).days + 1
+        rows = [i for i, node in enumerate(self.nodes.values()) if node.received_data is not None]
+        names = list(self.nodes)
+        names = [names[i] for i in rows]
+        position = np.full(len(self.nodes), -1, dtype=np.int64)
+        position[rows] = np.arange(len(rows))
+
+        starts, ends, holders = self.held_intervals(dataset)
+        keep = position[holders] >= 0
+        held = np.zeros((len(rows), days + 1), dtype=np.int8)
+        np.add.at(held, (position[holders[keep]], starts[keep]), 1)
+        np.add.at(held, (position[holders[keep]], ends[keep]), -1)
+        held = np.cumsum(held[:, :-1], axis=1, dtype=np.int8) > 0
+
         intervals = self.get_intervals()
-        print(f"\nPrinting intervals of dataset {dataset}")
-        for node in self.nodes.values():
-            if node.received_data is not None:
-                bar = ""
-                received = node.received_data[dataset].reindex(
-                    pd.date_range(start=series.earliest, end=series.latest, freq="1D"),
-                    fill_value=0
-                )
-                for index in series.index:
-                    if intervals[node.name][0] <= index <= intervals[node.name][1] and (received.loc[index] > 0).all():
-                        bar += "█"
-                    else:
-                        bar += "▒" if (received.loc[index] > 0).all() else "-"
-                print(f"[{series.earliest}]{bar}[{series.latest}] -> {node.name}")
-
-    def print_dataset_distribution(self, dataset: str):
-        data = self.get_daily_series(dataset)
-        df = self.get_dataset_copies(dataset)
-        print(f"\nPrinting distribution of dataset {dataset}")
-        for depth in range(int(df.max()), 0, -1):
-            bar = ""
-            for index in df.index:
-                if (depth <= df.loc[index]).all():
-                    bar += "█"
-                else:
-                    bar += " "
-            print(f"[{data.earliest}]{bar}[{data.latest}] -> {depth} copies")
+        bounds = np.array([intervals[name] for name in names], dtype="datetime64[ns]").reshape(-1, 2)
+        offsets = (bounds - first.astype("datetime64[ns]")) / np.timedelta64(1, "D")
+        lo = np.clip(np.ceil(offsets[:, 0]), 0, days).astype(np.int64)
+        hi = np.clip(np.floor(offsets[:, 1]) + 1, 0, days).astype(np.int64)
+        day = np.arange(days)
+        assigned = (lo[:, None] <= day) & (day < hi[:, None])
+        return names, held * (1 + assigned).astype(np.int8)
 
-    def print_statistics(self, dataset: str):
+    @timed("reporting")
+    def print_dataset_intervals(self, dataset: str, file: TextIO = None, day_bucket: int = 1, node_bucket: int = 1,
+                                png: str = None):
+        """Prints which days every node holds, █ marking days within the node's assigned interval. Buckets of
+        consecutive days or nodes are merged for large networks, showing the best holding of any day or node in the
+        bucket. With `png`, writes a heatmap to that path instead."""
+        earliest, latest = self.dataset_span(dataset)
+        names, codes = self.coverage_matrix(dataset)
+        codes = bucket(bucket(codes, day_bucket, 1, np.maximum), node_bucket, 0, np.maximum)
+        labels = bucket_labels(names, node_bucket)
+        if png is not None:
+            write_heatmap(codes, png, labels, f"Intervals of dataset {dataset}")
+            return
+        file = file or sys.stdout
+        file.write(f"\nPrinting intervals of dataset {dataset}\n")
+        write_rows(codes, "-▒█", labels, f"[{earliest}]", f"[{latest}]", file)
+
+    @timed("reporting")
+    def print_dataset_distribution(self, dataset: str, file: TextIO = None, day_bucket: int = 1, depth_bucket: int = 1,
+                                   png: str = None):
+        """Prints a histogram of the amount of copies of every day, a day bucket shows its least replicated day and
+        only every `depth_bucket`-th depth is printed. With `png`, writes a heatmap to that path instead."""
+        earliest, latest = self.dataset_span(dataset)
+        copies = bucket(self.dataset_copies(dataset), day_bucket, 0, np.minimum)
+        depths = range(int(copies.max(initial=0)), 0, -max(depth_bucket, 1))
+        if png is not None:
+            write_heatmap(np.array([copies >= depth for depth in depths]).reshape(-1, len(copies)), png,
+                          [f"{depth}" for depth in depths], f"Distribution of dataset {dataset}")
+            return
+        file = file or sys.stdout
+        file.write(f"\nPrinting distribution of dataset {dataset}\n")
+        for depth in depths:
+            write_rows((copies >= depth).astype(np.int8)[None], " █", [f"{depth} copies"],
+                       f"[{earliest}]", f"[{latest}]", file)
+
+    def statistics(self, dataset: str) -> Dict[str, float]:
+        """Returns the summary statistics printed by print_statistics"""
         obs = self.observations(dataset)
-        total = len(self.get_daily_series(dataset))
-        print(f"\nTotal nodes: {len(self.nodes)}")
+        return {
+            "total_nodes": len(self.nodes),
+            "total_slices": self.owner_lookup[dataset].own_data.held_intervals(dataset).count(),
+            "min_observed": float(obs.min()),
+            "mean_observed": float(obs.mean()),
+            "max_observed": float(obs.max()),
+        }
+
+    def print_statistics(self, dataset: str):
+        stats = self.statistics(dataset)
+        total = stats["total_slices"]
+        obs_min, obs_mean, obs_max = stats["min_observed"], stats["mean_observed"], stats["max_observed"]
+        print(f"\nTotal nodes: {stats['total_nodes']}")
         print(f"Total slices: {total}")
-        print(f"Minimum amount of ticks observed: {obs.min(): .2f} of {total} ({100 * obs.min() / total: .1f} %)")
-        print(f"Average amount of ticks observed: {obs.mean(): .2f} of {total} ({100 * obs.mean() / total: .1f} %)")
-        print(f"Maximum amount of ticks observed: {obs.max(): .2f} of {total} ({100 * obs.max() / total: .1f} %)")
+        print(f"Minimum amount of ticks observed: {obs_min: .2f} of {total} ({100 * obs_min / total: .1f} %)")
+        print(f"Average amount of ticks observed: {obs_mean: .2f} of {total} ({100 * obs_mean / total: .1f} %)")
+        print(f"Maximum amount of ticks observed: {obs_max: .2f} of {total} ({100 * obs_max / total: .1f} %)")
 
 
 def create_network(nodes_cnt: int, days_of_data: int = None, tree_type: TreeType = TreeType.ordered_ltor) -> Network:
@@ -1,63 +1,97 @@
-from typing import Optional
+import sys
+from copy import copy
+from typing import Optional, Union, List, Tuple
 
 import numpy as np
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
-from .data import DailySeries
+from .data import DailySeries, DailyBuffer, IntervalSeries
+from .instrumentation import instrumentation
 from .words import words
 
 
 class Node:
-    own_data: Optional[DailySeries]
-    received_data: Optional[DailySeries]
-    assigned_start: Optional[datetime]
-    assigned_end: Optional[datetime]
+    """A participant of the network. Unnamed nodes are named by a word picked by their hash once on creation."""
+    __slots__ = ("own_data", "received_data", "_name")
+    own_data: Optional[DailyBuffer]
+    received_data: Optional[IntervalSeries]
     _name: str
 
     def __init__(self, own_data: DailySeries = None, name: str = None):
-        self.own_data = own_data
+        self.own_data = None if own_data is None else DailyBuffer.from_daily_series(own_data)
         self.received_data = None
-        self._name = name
+        self._name = sys.intern(words[hash(self) % len(words)] if name is None else name)
 
     @property
-    def name(self):
-        return words[hash(self) % len(words)] if self._name is None else self._name
+    def name(self) -> str:
+        return self._name
 
     @property
     def earliest(self):
-        earliest = np.min(np.array([self.own_data.earliest if self.own_data is not None else datetime.max,
-                                    self.received_data.earliest if self.received_data is not None else datetime.max],
-                                   dtype='datetime64'))
-        return earliest
+        days = [data.earliest for data in (self.own_data, self.received_data)
+                if data is not None and data.earliest is not None]
+        return np.min(np.array(days if days else [datetime.max], dtype='datetime64'))
 
     @property
     def latest(self):
-        return np.max(np.array([self.own_data.latest if self.own_data is not None else datetime.min,
-                                self.received_data.latest if self.received_data is not None else datetime.min],
-                               dtype='datetime64'))
+        days = [data.latest for data in (self.own_data, self.received_data)
+                if data is not None and data.latest is not None]
+        return np.max(np.array(days if days else [datetime.min], dtype='datetime64'))
 
-    def receive_data(self, data: DailySeries):
+    @property
+    def bounds(self) -> Optional[Tuple[date, date]]:
+        """The first and last day of all data held, None without any data."""
+        held = [data for data in (self.own_data, self.received_data) if data is not None]
+        earliest = [data.earliest for data in held if data.earliest is not None]
+        latest = [data.latest for data in held if data.latest is not None]
+        return (min(earliest), max(latest)) if earliest and latest else None
+
+    def receive_data(self, data: Union[DailySeries, IntervalSeries]):
+        instrumentation.count("receive_data_calls")
+        if self.received_data is None:
+            self.received_data = IntervalSeries()
+        self.received_data.add(data)
+
+    def evict_data(self, data: IntervalSeries):
         if self.received_data is not None:
-            self.received_data = self.received_data + data
-        else:
-            self.received_data = DailySeries(data.__copy__())
+            self.received_data.remove(data)
+
+    def receive_intervals(self, features: List[str], starts: np.ndarray, ends: np.ndarray):
+        """Receives one interval of days per entry, see IntervalSeries.add_intervals."""
+        instrumentation.count("receive_data_calls")
+        if self.received_data is None:
+            self.received_data = IntervalSeries()
+        self.received_data.add_intervals(features, starts, ends)
+
+    def evict_intervals(self, features: List[str], starts: np.ndarray, ends: np.ndarray):
+        if self.received_data is not None:
+            self.received_data.remove_intervals(features, starts, ends)
 
     def add_own_data(self, data: DailySeries):
         if self.own_data is not None:
             self.own_data = self.own_data + data
         else:
-            self.own_data = data
+            self.own_data = DailyBuffer.from_daily_series(data)
 
     def remove_own_data(self, dataset: str):
         del self.own_data[dataset]
 
-    def tick(self, day: date):
-        self.own_data.add_observation(day)
+    def tick(self, day: date, days: int = 1):
+        """Adds observations for the given amount of days ending on given day."""
+        instrumentation.count("add_observation_calls")
+        self.own_data.add_observations(day - timedelta(days - 1), day)
 
     def observations(self, dataset: str) -> float:
         if self.received_data is None:
             return 0.0
-        return self.received_data.agg(np.count_nonzero)[dataset]
+        return self.received_data.observations(dataset)
+
+    def __copy__(self) -> "Node":
+        """Returns a node sharing all data with this one until either of them changes it."""
+        node = Node(name=self.name)
+        node.own_data = copy(self.own_data)
+        node.received_data = copy(self.received_data)
+        return node
 
     def __str__(self):
         if self.own_data is not None:
@@ -0,0 +1,59 @@
+import sys
+from typing import Iterator, List, Optional, TextIO
+
+import numpy as np
+
+
+def bucket(matrix: np.ndarray, size: int, axis: int, reduce: np.ufunc) -> np.ndarray:
+    """Down-samples a matrix by reducing every `size` consecutive entries along an axis into one, the last bucket may
+    be smaller"""
+    if size <= 1 or matrix.shape[axis] == 0:
+        return matrix
+    return reduce.reduceat(matrix, np.arange(0, matrix.shape[axis], size), axis=axis)
+
+
+def bucket_labels(labels: List[str], size: int) -> List[str]:
+    if size <= 1:
+        return labels
+    buckets = []
+    for i in range(0, len(labels), size):
+        last = min(i + size, len(labels)) - 1
+        buckets.append(labels[i] if last == i else f"{labels[i]}..{labels[last]}")
+    return buckets
+
+
+def render_rows(codes: np.ndarray, chars: str) -> Iterator[str]:
+    """Yields every row of a matrix of small integer codes as a string, mapping code i to chars[i]"""
+    table = np.array(list(chars), dtype="<U1")
+    width = codes.shape[1] if codes.ndim == 2 else 0
+    for row in codes:
+        yield table[row].view(f"<U{width}")[0] if width else ""
+
+
+def write_rows(codes: np.ndarray, chars: str, labels: List[str], prefix: str, suffix: str,
+               file: Optional[TextIO] = None):
+    """Writes every row of a code matrix between a prefix and a suffix, followed by its label"""
+    file = file or sys.stdout
+    for bar, label in zip(render_rows(codes, chars), labels):
+        file.write(f"{prefix}{bar}{suffix} -> {label}\n")
+
+
+def write_heatmap(matrix: np.ndarray, path: str, labels: List[str] = None, title: str = None):
+    """Writes a matrix as a PNG heatmap, requires matplotlib"""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError as e:
+        raise ImportError("Writing heatmaps requires matplotlib") from e
+    height = min(max(len(matrix) / 8, 2), 40)
+    fig, ax = plt.subplots(figsize=(12, height))
+    ax.imshow(matrix, aspect="auto", interpolation="nearest", cmap="viridis")
+    ax.set_xlabel("day")
+    if labels is not None and len(labels) <= 64:
+        ax.set_yticks(range(len(labels)))
+        ax.set_yticklabels(labels, fontsize=6)
+    if title:
+        ax.set_title(title)
+    fig.savefig(path, dpi=150, bbox_inches="tight")
+    plt.close(fig)
@@ -0,0 +1,93 @@
+import heapq
+import random
+from datetime import date, timedelta
+from enum import Enum
+from typing import List, Tuple, Any, Optional
+
+from .network import Network
+
+
+class EventType(Enum):
+    join = 1  # args: nodes_cnt, features_cnt
+    leave = 2  # args: node name, or None for a random node not owning a distributed dataset
+    data_arrival = 3  # args: node name, features_cnt of a new own dataset
+    redistribution = 4  # args: dataset, or None for all datasets distributed so far
+
+
+class Simulation:
+    """Event-driven simulation kernel. Events are kept in a heap keyed by date and the network jumps straight to the
+    date of the next event, ticking all days in between in one bulk step. Runtime is therefore proportional to the
+    amount of events instead of days times nodes."""
+    net: Network
+    rng: random.Random
+    transferred: List[Tuple[date, int]]
+    _queue: List[Tuple[date, int, EventType, Tuple[Any, ...]]]
+    _scheduled: int
+
+    def __init__(self, net: Network, seed: int = None):
+        self.net = net
+        self.rng = random.Random(seed)
+        self.transferred = []
+        self._queue = []
+        self._scheduled = 0
+
+    def schedule(self, day: date, event: EventType, *args):
+        """Schedules an event. Events on the same day are handled in the order they were scheduled."""
+        heapq.heappush(self._queue, (day, self._scheduled, event, args))
+        self._scheduled += 1
+
+    def schedule_every(self, start: date, end: date, period: int, event: EventType, *args):
+        """Schedules an event every `period` days from start until end."""
+        day = start
+        while day <= end:
+            self.schedule(day, event, *args)
+            day += timedelta(period)
+
+    def schedule_rate(self, start: date, end: date, rate: float, event: EventType, *args):
+        """Schedules an event on the days on which a fractional daily rate accumulates to another occurrence."""
+        for i in range((end - start).days + 1):
+            for _ in range(int(rate * (i + 1)) - int(rate * i)):
+                self.schedule(start + timedelta(i), event, *args)
+
+    @property
+    def next_event(self) -> Optional[date]:
+        return self._queue[0][0] if self._queue else None
+
+    def run(self, until: date) -> int:
+        """Processes all events up to the given date, advances the network to it and returns the amount of events
+        processed."""
+        processed = 0
+        while self._queue and self._queue[0][0] <= until:
+            day, _, event, args = heapq.heappop(self._queue)
+            self.advance(day)
+            self.handle(day, event, *args)
+            processed += 1
+        self.advance(until)
+        return processed
+
+    def advance(self, day: date):
+        if day > self.net.current_date:
+            self.net.tick((day - self.net.current_date).days)
+
+    def handle(self, day: date, event: EventType, *args):
+        if event == EventType.join:
+            self.net.create_nodes(*args)
+        elif event == EventType.leave:
+            name = args[0] if args else None
+            if name is None:
+                protected = {self.net.owner_lookup[dataset].name for dataset in self.net.distributed_datasets()}
+                candidates = [name for name in self.net.nodes if name not in protected]
+                if not candidates:
+                    return
+                name = self.rng.choice(candidates)
+            if name in self.net.nodes:
+                self.net.remove_node(name)
+        elif event == EventType.data_arrival:
+            name, features_cnt = args
+            if name in self.net.nodes:
+                self.net.add_datasets(name, features_cnt, day)
+        elif event == EventType.redistribution:
+            dataset = args[0] if args else None
+            datasets = self.net.distributed_datasets() if dataset is None else [dataset]
+            for cells in self.net.distribute_datasets(datasets, delta=True).values():
+                self.transferred.append((day, cells))
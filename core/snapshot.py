@@ -0,0 +1,146 @@
+import json
+import os
+from typing import Dict, List, Tuple, Callable
+
+import numpy as np
+import pandas as pd
+
+from .data import DailyBuffer, IntervalSet, IntervalSeries
+from .network import Network, TreeType, ORDERED_DIRECTIONS
+from .node import Node
+from .tree import encode_tree, decode_tree
+
+SNAPSHOT_VERSION = 1
+
+
+def _pack(intervals: List[IntervalSet]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Concatenates interval sets into starts, ends and offsets of every set within them."""
+    offsets = np.zeros(len(intervals) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(s) for s in intervals])
+    starts = np.concatenate([s.starts for s in intervals] + [np.empty(0, dtype="datetime64[D]")])
+    ends = np.concatenate([s.ends for s in intervals] + [np.empty(0, dtype="datetime64[D]")])
+    return starts, ends, offsets
+
+
+def _unpack(starts: np.ndarray, ends: np.ndarray, offsets: np.ndarray) -> List[IntervalSet]:
+    return [IntervalSet.from_normalized(starts[offsets[i]:offsets[i + 1]], ends[offsets[i]:offsets[i + 1]])
+            for i in range(len(offsets) - 1)]
+
+
+def _pack_series(series: List[IntervalSeries], prefix: str, columns: Dict[str, np.ndarray]) -> Dict[str, list]:
+    """Stores the slot arrays of several series back to back in columns and returns the metadata to unpack them."""
+    arrays = [s.arrays for s in series]
+    columns[f"{prefix}_offsets"] = np.r_[0, np.cumsum([len(s) for s in series], dtype=np.int64)]
+    columns[f"{prefix}_starts"] = np.concatenate([starts for starts, _ in arrays] + [np.empty(0, "datetime64[D]")])
+    columns[f"{prefix}_ends"] = np.concatenate([ends for _, ends in arrays] + [np.empty(0, "datetime64[D]")])
+    split = [(i, feature, intervals) for i, s in enumerate(series) for feature, intervals in s.split.items()]
+    columns[f"{prefix}_split_starts"], columns[f"{prefix}_split_ends"], columns[f"{prefix}_split_offsets"] = \
+        _pack([intervals for _, _, intervals in split])
+    return {"features": [s.columns for s in series], "split": [[i, feature] for i, feature, _ in split]}
+
+
+def _unpack_series(meta: Dict[str, list], prefix: str, column: Callable[[str], np.ndarray]) -> List[IntervalSeries]:
+    offsets, starts, ends = column(f"{prefix}_offsets"), column(f"{prefix}_starts"), column(f"{prefix}_ends")
+    split: List[Dict[str, IntervalSet]] = [{} for _ in meta["features"]]
+    intervals = _unpack(column(f"{prefix}_split_starts"), column(f"{prefix}_split_ends"),
+                        column(f"{prefix}_split_offsets"))
+    for (i, feature), feature_intervals in zip(meta["split"], intervals):
+        split[i][feature] = feature_intervals
+    return [IntervalSeries.from_arrays(features, starts[offsets[i]:offsets[i + 1]], ends[offsets[i]:offsets[i + 1]],
+                                       split[i])
+            for i, features in enumerate(meta["features"])]
+
+
+def _date(day) -> str:
+    return None if day is None else str(day)
+
+
+def save_network(net: Network, path: str):
+    """Writes the state of a network to a directory, with one .npy file per column so every column can be
+    memory-mapped on load. The metadata file is written last and marks the snapshot as complete."""
+    os.makedirs(path, exist_ok=True)
+    nodes = list(net.nodes.values())
+    buffers = [node.own_data for node in nodes]
+    columns: Dict[str, np.ndarray] = {
+        "own_data": np.concatenate([buffer.data.ravel() for buffer in buffers if buffer is not None]
+                                   + [np.empty(0, dtype=np.int8)]),
+        "own_length": np.array([len(buffer) if buffer is not None else 0 for buffer in buffers], dtype=np.int64),
+        "own_earliest": np.array([buffer.earliest if buffer is not None else None for buffer in buffers],
+                                 dtype="datetime64[D]"),
+        "own_latest": np.array([buffer.latest if buffer is not None else None for buffer in buffers],
+                               dtype="datetime64[D]"),
+    }
+    received = _pack_series([node.received_data for node in nodes if node.received_data is not None], "received",
+                            columns)
+    assigned = _pack_series(list(net._assignments.values()), "assigned", columns)
+    position = {name: i for i, name in enumerate(net.nodes)}
+    if net.tree_type not in ORDERED_DIRECTIONS:
+        values, columns["tree_left"], columns["tree_right"] = encode_tree(net._tree)
+        columns["tree_values"] = np.array([position[value] for value in values], dtype=np.int64)
+    for name, values in columns.items():
+        np.save(os.path.join(path, f"{name}.npy"), values, allow_pickle=False)
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "start_date": _date(net.start_date),
+        "current_date": _date(net.current_date),
+        "tree_type": net.tree_type.name,
+        "nodes_created": net.nodes_created,
+        "nodes": list(net.nodes),
+        "own_columns": [buffer.columns if buffer is not None else None for buffer in buffers],
+        "received_data": [node.received_data is not None for node in nodes],
+        "received": received,
+        "distributed": list(net._assignments),
+        "assigned": assigned,
+        "interval_assignment": {"names": net._interval_assignment.names, "widths": net._interval_assignment.widths},
+        "moved_cells": net.moved_cells,
+    }
+    with open(os.path.join(path, "network.json"), "w") as file:
+        json.dump(meta, file)
+
+
+def load_network(path: str, mmap: bool = True) -> Network:
+    """Reads a network written by save_network. With `mmap`, observations and intervals stay in the memory-mapped
+    files and are only copied into memory once they are changed."""
+    with open(os.path.join(path, "network.json")) as file:
+        meta = json.load(file)
+    if meta["version"] != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {meta['version']}")
+
+    def column(name: str) -> np.ndarray:
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None, allow_pickle=False)
+
+    net = Network(meta["start_date"], meta["current_date"], TreeType[meta["tree_type"]])
+    net.nodes_created = meta["nodes_created"]
+    own_data, own_length = column("own_data"), column("own_length")
+    own_earliest, own_latest = column("own_earliest"), column("own_latest")
+    offset = 0
+    for i, name in enumerate(meta["nodes"]):
+        node = Node(name=name)
+        columns = meta["own_columns"][i]
+        if columns is not None:
+            size = int(own_length[i]) * len(columns)
+            rows = own_data[offset:offset + size].reshape(int(own_length[i]), len(columns))
+            offset += size
+            node.own_data = DailyBuffer.from_array(columns, pd.Timestamp(own_earliest[i]).date(), rows)
+            node.own_data.latest = None if np.isnat(own_latest[i]) else pd.Timestamp(own_latest[i]).date()
+            for dataset in columns:
+                net.owner_lookup[dataset] = node
+        net.nodes[name] = node
+
+    names = meta["nodes"]
+    received = iter(_unpack_series(meta["received"], "received", column))
+    for name, has_received in zip(names, meta["received_data"]):
+        if has_received:
+            net.nodes[name].received_data = next(received)
+        net.node_changed(name)
+    net._assignments = dict(zip(meta["distributed"], _unpack_series(meta["assigned"], "assigned", column)))
+
+    if net.tree_type not in ORDERED_DIRECTIONS:
+        values = column("tree_values")
+        net._tree = decode_tree([names[value] for value in values], column("tree_left"), column("tree_right"))
+        net._tree_nodes = {} if net._tree is None else {tree_node.value: tree_node for tree_node in net._tree}
+    net._interval_assignment.names = list(meta["interval_assignment"]["names"])
+    net._interval_assignment.widths = list(meta["interval_assignment"]["widths"])
+    net.moved_cells = [tuple(moved) for moved in meta["moved_cells"]]
+    return net
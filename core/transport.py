@@ -0,0 +1,161 @@
+import asyncio
+import random
+import selectors
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .network import Network, Transport, Delivery
+
+
+class Link(NamedTuple):
+    bandwidth: float = 1e6  # uplink bytes per second
+    latency: float = 0.05  # seconds until a sent message arrives
+    loss: float = 0.0  # probability that a sent message is lost and has to be sent again
+
+
+def check_loss(link: Link) -> Link:
+    """Returns given link unless it would lose every message, which would then be sent forever."""
+    if not 0 <= link.loss < 1:
+        raise ValueError(f"Link loss must be at least 0 and below 1, got {link.loss}")
+    return link
+
+
+class TransferReport(NamedTuple):
+    makespan: float  # simulated seconds until the last message was received
+    messages: int
+    lost: int
+    bytes_sent: Dict[str, int]
+    bytes_received: Dict[str, int]
+    busy: Dict[str, float]  # simulated seconds every uplink was sending
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self.bytes_sent.values())
+
+    def busiest_uplinks(self, count: int = 5) -> List[Tuple[str, float, int]]:
+        """Returns the nodes whose uplinks were sending the longest, with their busy seconds and sent bytes."""
+        busiest = sorted(self.busy, key=self.busy.get, reverse=True)[:count]
+        return [(name, self.busy[name], self.bytes_sent[name]) for name in busiest]
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Skips waiting for the next timer by advancing the clock of its event loop instead."""
+
+    def __init__(self, loop: "VirtualTimeLoop"):
+        super().__init__()
+        self.loop = loop
+
+    def select(self, timeout: Optional[float] = None):
+        if timeout is None:
+            raise RuntimeError("All actors are waiting for messages which will never arrive")
+        self.loop.now += timeout
+        return super().select(0)
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Event loop running on simulated time. Sleeping advances the clock immediately, so simulating a transfer of
+    hours takes as long as the callbacks it runs, and runs are deterministic."""
+    now: float
+
+    def __init__(self):
+        self.now = 0.0
+        super().__init__(_VirtualSelector(self))
+
+    def time(self) -> float:
+        return self.now
+
+
+class SimulatedTransport(Transport):
+    """Delivers the slices of a distribution as messages between actors through a simulated link layer. Every node is
+    an actor processing its inbox. Owners send the slices of their datasets to every receiver in one message per
+    receiver and dataset. Messages queue up on the uplink of their sender, take size / bandwidth to send and arrive
+    after the sender's latency, or get lost and are sent again. Slices of a receiver's own datasets are applied
+    locally. Every message eventually arrives, so the network ends up in the same state as with direct delivery. A
+    TransferReport of every distribution is kept in `reports`."""
+    default: Link
+    links: Dict[str, Link]
+    cell_bytes: int
+    rng: random.Random
+    reports: List[TransferReport]
+
+    def __init__(self, default: Link = Link(), links: Dict[str, Link] = None, cell_bytes: int = 8, seed: int = None):
+        self.default = default
+        self.links = {} if links is None else links
+        self.cell_bytes = cell_bytes
+        self.rng = random.Random(seed)
+        self.reports = []
+        for link in [self.default, *self.links.values()]:
+            check_loss(link)
+
+    def link(self, name: str) -> Link:
+        return check_loss(self.links.get(name, self.default))
+
+    def deliver(self, net: Network, deliveries: List[Delivery]):
+        loop = VirtualTimeLoop()
+        try:
+            self.reports.append(loop.run_until_complete(self._distribute(net, deliveries)))
+        finally:
+            loop.close()
+
+    async def _distribute(self, net: Network, deliveries: List[Delivery]) -> TransferReport:
+        loop = asyncio.get_running_loop()
+        uplinks: Dict[str, asyncio.Lock] = {}
+        inboxes: Dict[str, asyncio.Queue] = {name: asyncio.Queue() for name, *_ in deliveries}
+        bytes_sent: Dict[str, int] = {}
+        bytes_received: Dict[str, int] = {}
+        busy: Dict[str, float] = {}
+        lost = 0
+        finished = 0.0
+
+        async def send(sender: str, receiver: str, message: Tuple[List[str], np.ndarray, np.ndarray]):
+            nonlocal lost
+            size = self.cell_bytes * int((message[2] - message[1]).astype(np.int64).sum())
+            link = self.link(sender)
+            while True:
+                async with uplinks.setdefault(sender, asyncio.Lock()):
+                    await asyncio.sleep(size / link.bandwidth)
+                bytes_sent[sender] = bytes_sent.get(sender, 0) + size
+                busy[sender] = busy.get(sender, 0.0) + size / link.bandwidth
+                await asyncio.sleep(link.latency)
+                if self.rng.random() >= link.loss:
+                    break
+                lost += 1
+            bytes_received[receiver] = bytes_received.get(receiver, 0) + size
+            await inboxes[receiver].put(message)
+
+        async def actor(name: str):
+            nonlocal finished
+            inbox = inboxes[name]
+            while True:
+                batch = [await inbox.get()]
+                while not inbox.empty():
+                    batch.append(inbox.get_nowait())
+                net.nodes[name].receive_intervals([feature for features, _, _ in batch for feature in features],
+                                                  np.concatenate([starts for _, starts, _ in batch]),
+                                                  np.concatenate([ends for _, _, ends in batch]))
+                finished = max(finished, loop.time())
+                for _ in batch:
+                    inbox.task_done()
+
+        messages = []
+        for receiver, features, starts, ends in deliveries:
+            # empty slices only tell the receiver about the dataset and slices of its own datasets are already
+            # there, neither needs a transfer
+            senders = np.array([net.owner_lookup[feature].name for feature in features], dtype=object)
+            local = (starts >= ends) | (senders == receiver)
+            kept = np.flatnonzero(local)
+            net.nodes[receiver].receive_intervals([features[i] for i in kept], starts[kept], ends[kept])
+            sent = np.flatnonzero(~local)
+            senders = senders[sent]
+            for sender in dict.fromkeys(senders):
+                entries = sent[senders == sender]
+                messages.append((sender, receiver, ([features[i] for i in entries], starts[entries], ends[entries])))
+        actors = [asyncio.ensure_future(actor(name)) for name in inboxes]
+        await asyncio.gather(*(send(*message) for message in messages))
+        for inbox in inboxes.values():
+            await inbox.join()
+        for task in actors:
+            task.cancel()
+        await asyncio.gather(*actors, return_exceptions=True)
+        return TransferReport(finished, len(messages), lost, bytes_sent, bytes_received, busy)
@@ -1,11 +1,17 @@
 import random
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+import numpy as np
 
 from binarytree import Node as TreeNode, NodeValue, NodeNotFoundError, _ATTR_LEFT, _ATTR_RIGHT, NodeValueList
 
+from .instrumentation import instrumentation
+
 
 class IntervalTreeNode(TreeNode):
     parent: Optional["IntervalTreeNode"]
+    _size: int
+    extent: int  # len(values), i.e. one more than the largest heap index within this subtree
 
     def __init__(self,
                  value: NodeValue,
@@ -14,6 +20,21 @@ class IntervalTreeNode(TreeNode):
                  parent: Optional["IntervalTreeNode"] = None):
         super().__init__(value, left, right)
         self.parent = parent
+        self.refresh()
+
+    @property
+    def size(self) -> int:
+        """Node count of this subtree, maintained on insertion and removal instead of being traversed."""
+        return self._size
+
+    @size.setter
+    def size(self, size: int):
+        self._size = size
+
+    def refresh(self):
+        """Recomputes size and extent from the children."""
+        self.size = 1 + subtree_size(self.left) + subtree_size(self.right)
+        self.extent = max(1, child_extent(self.left, 1), child_extent(self.right, 2))
 
     @property
     def leftmost(self) -> "IntervalTreeNode":
@@ -33,23 +54,38 @@ class IntervalTreeNode(TreeNode):
     def left_to_right(self) -> List["IntervalTreeNode"]:
         """Returns a list representation by traversing the deepest nodes first and beginning on the deepest,
         left-most leaf. """
-        nodes: List["IntervalTreeNode"] = [self.leftmost]
-        current = nodes[0]
-        if current.right:
-            nodes.extend(current.right.left_to_right)
-        while current.parent:
-            if current.parent.left == current:
-                nodes.append(current.parent)
-                current = nodes[-1]
-                if current.right:
-                    nodes.extend(current.right.left_to_right)
-            else:
-                break
+        nodes: List["IntervalTreeNode"] = []
+        stack: List["IntervalTreeNode"] = []
+        current: Optional["IntervalTreeNode"] = self
+        while stack or current is not None:
+            while current is not None:
+                stack.append(current)
+                current = current.left
+            current = stack.pop()
+            nodes.append(current)
+            current = current.right
+        instrumentation.count("tree_nodes_visited", len(nodes))
         return nodes
 
+    def select(self, rank: int) -> "IntervalTreeNode":
+        """Returns the node at the given position of left_to_right in O(log N)."""
+        node = self
+        while True:
+            instrumentation.count("tree_nodes_visited")
+            left_size = subtree_size(node.left)
+            if rank < left_size:
+                node = node.left
+            elif rank == left_size:
+                return node
+            else:
+                rank -= left_size + 1
+                node = node.right
+
 
 def build_ordered(values: NodeValueList, direction: str = "ltor") -> Optional[IntervalTreeNode]:
     nodes = [None if v is None else IntervalTreeNode(v) for v in values]
+    instrumentation.count("tree_rebuilds")
+    instrumentation.count("tree_nodes_visited", len(nodes))
 
     for index in range(1, len(nodes)):
         node = nodes[index]
@@ -65,38 +101,159 @@ def build_ordered(values: NodeValueList, direction: str = "ltor") -> Optional[In
             else:
                 setattr(parent, _ATTR_RIGHT if index % 2 else _ATTR_LEFT, node)
             node.parent = parent
+    for node in reversed(nodes):
+        if node is not None:
+            node.refresh()
 
     return nodes[0] if nodes else None
 
 
-# TODO: Keep tree position of existing nodes, do not reorganize
+def ordered_ranks(count: int, direction: str = "ltor") -> np.ndarray:
+    """Returns the left_to_right position of every heap index of an ordered tree with `count` nodes in O(N),
+    without building the tree.
+
+    A node at depth d and level offset k has position (2k + 1) * 2^(H - d) - 1 in the perfect tree of height H. The
+    last level is only filled up to `count`, so the missing leaves left of that position are subtracted."""
+    index = np.arange(count, dtype=np.int64)
+    if count == 0:
+        return index
+    height = count.bit_length() - 1
+    depth = np.floor(np.log2(index + 1)).astype(np.int64)
+    offset = index - (1 << depth) + 1
+    perfect = (2 * offset + 1) * (1 << (height - depth)) - 1
+    leaves = count - (1 << height) + 1
+    ranks = perfect - np.maximum(0, (perfect + 1) // 2 - leaves)
+    return ranks if direction == "ltor" else count - 1 - ranks
+
+
+def ordered_index(rank: int, count: int, direction: str = "ltor") -> int:
+    """Returns the heap index of the node at the given left_to_right position of an ordered tree in O(1)."""
+    if direction != "ltor":
+        rank = count - 1 - rank
+    height = count.bit_length() - 1
+    leaves = count - (1 << height) + 1
+    perfect = rank if rank < 2 * leaves else 2 * (rank - leaves) + 1
+    level = ((perfect + 1) & -(perfect + 1)).bit_length() - 1
+    return (1 << (height - level)) - 1 + ((perfect + 1) >> (level + 1))
+
+
 def build_balanced(values: NodeValueList, direction: str = "ltor") -> Optional[IntervalTreeNode]:
-    nodes = [None if v is None else IntervalTreeNode(v) for v in values]
-    root = nodes[0]
-    for i in range(1, len(nodes)):
-        node = nodes[i]
-        if node is not None:
-            parent = find_shallowest_branch(root, direction)
-            if direction == "random":
-                direction = random.choice(["ltor", "rtol"])
-            if direction == "ltor":
-                setattr(parent, _ATTR_LEFT if parent.left is None else _ATTR_RIGHT, node)
-            else:
-                setattr(parent, _ATTR_RIGHT if parent.right is None else _ATTR_LEFT, node)
-            node.parent = parent
+    instrumentation.count("tree_rebuilds")
+    root = None
+    for v in values:
+        if v is not None:
+            root = insert_balanced(root, IntervalTreeNode(v), direction)
+    return root
+
+
+def insert_balanced(root: Optional[IntervalTreeNode],
+                    node: IntervalTreeNode,
+                    direction: str = "ltor") -> IntervalTreeNode:
+    """Attaches a node to the shallowest branch in O(log N) without moving any existing node. Returns the root."""
+    if root is None:
+        return node
+    if direction == "random":
+        direction = random.choice(["ltor", "rtol"])
+    parent = find_shallowest_branch(root, direction)
+    if direction == "ltor":
+        setattr(parent, _ATTR_LEFT if parent.left is None else _ATTR_RIGHT, node)
+    else:
+        setattr(parent, _ATTR_RIGHT if parent.right is None else _ATTR_LEFT, node)
+    node.parent = parent
+    instrumentation.count("tree_nodes_visited", 2 * refresh_ancestors(node))
+    return root
+
+
+def remove_balanced(root: IntervalTreeNode, node: IntervalTreeNode) -> Optional[IntervalTreeNode]:
+    """Detaches a node in O(log N). A leaf of its larger branch takes over its position, all other nodes stay in
+    place. Returns the (possibly new) root."""
+    leaf = node
+    while leaf.left is not None or leaf.right is not None:
+        leaf = leaf.left if subtree_size(leaf.left) >= subtree_size(leaf.right) else leaf.right
+    parent = leaf.parent
+    if parent is None:
+        return None
+    setattr(parent, _ATTR_LEFT if parent.left is leaf else _ATTR_RIGHT, None)
+    leaf.parent = None
+    depth = refresh_ancestors(leaf, parent)
+    if leaf is node:
+        instrumentation.count("tree_nodes_visited", 2 * depth)
+        return root
+
+    leaf.left, leaf.right = node.left, node.right
+    for child in (leaf.left, leaf.right):
+        if child is not None:
+            child.parent = leaf
+    leaf.parent = node.parent
+    if node.parent is not None:
+        setattr(node.parent, _ATTR_LEFT if node.parent.left is node else _ATTR_RIGHT, leaf)
+    node.left = node.right = node.parent = None
+    node.refresh()
+    leaf.refresh()
+    instrumentation.count("tree_nodes_visited", 2 * (depth + refresh_ancestors(leaf)))
+    return leaf if node is root else root
 
-    return nodes[0] if nodes else None
+
+def refresh_ancestors(node: IntervalTreeNode, parent: Optional[IntervalTreeNode] = None) -> int:
+    """Refreshes all ancestors of a node bottom-up, starting at `parent` if the node was detached from it. Returns the
+    amount of refreshed nodes."""
+    parent = node.parent if parent is None else parent
+    depth = 0
+    while parent is not None:
+        parent.refresh()
+        parent = parent.parent
+        depth += 1
+    return depth
 
 
 def find_shallowest_branch(node: IntervalTreeNode, direction: str = "ltor") -> IntervalTreeNode:
-    while node.leaf_count >= 2:
-        if len(node.left.values) == len(node.right.values):
+    """Descends into the branch with the shorter level-order representation, as the rebuilding implementation did by
+    comparing len(values) of both branches."""
+    while node.left is not None and node.right is not None:
+        if node.left.extent == node.right.extent:
             if direction == "ltor":
                 node = node.left
             else:
                 node = node.right
-        elif len(node.left.values) > len(node.right.values):
+        elif node.left.extent > node.right.extent:
             node = node.right
         else:
             node = node.left
     return node
+
+
+def subtree_size(node: Optional[IntervalTreeNode]) -> int:
+    return 0 if node is None else node.size
+
+
+def child_extent(child: Optional[IntervalTreeNode], index: int) -> int:
+    """Returns the extent a child at heap index 1 (left) or 2 (right) gives its parent. The last node of the child at
+    depth d moves one level down and, for a right child, 2^d positions further."""
+    if child is None:
+        return 0
+    last = child.extent - 1
+    return last + index * (1 << ((last + 1).bit_length() - 1)) + 1
+
+
+def encode_tree(root: Optional[IntervalTreeNode]) -> Tuple[List[NodeValue], np.ndarray, np.ndarray]:
+    """Returns the values of all nodes in breadth-first order along with the positions of their left and right
+    children in that order, -1 for missing children."""
+    nodes = [] if root is None else [root]
+    for node in nodes:
+        nodes.extend(child for child in (node.left, node.right) if child is not None)
+    position = {id(node): i for i, node in enumerate(nodes)}
+    left = np.array([position[id(node.left)] if node.left is not None else -1 for node in nodes], dtype=np.int64)
+    right = np.array([position[id(node.right)] if node.right is not None else -1 for node in nodes], dtype=np.int64)
+    return [node.value for node in nodes], left, right
+
+
+def decode_tree(values: List[NodeValue], left: np.ndarray, right: np.ndarray) -> Optional[IntervalTreeNode]:
+    """Rebuilds a tree encoded by encode_tree, children come after their parents so nodes are built backwards."""
+    nodes: List[Optional[IntervalTreeNode]] = [None] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        children = [nodes[int(child)] if child >= 0 else None for child in (left[i], right[i])]
+        nodes[i] = IntervalTreeNode(values[i], *children)
+        for child in children:
+            if child is not None:
+                child.parent = nodes[i]
+    return nodes[0] if nodes else None
@@ -1,5 +1,42 @@
-from typing import List
+import mmap
+import os
+from typing import Optional, Sequence
 
-words: List[str]
-with open('resources/words_alpha.txt') as word_file:
-    words = list(word_file.read().split())
+import numpy as np
+
+WORDS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources", "words_alpha.txt")
+
+
+class WordList(Sequence[str]):
+    """Newline-separated words of a file, which is only memory-mapped and indexed by line offsets on first access."""
+    path: str
+    _file: Optional[mmap.mmap]
+    _starts: Optional[np.ndarray]
+    _ends: Optional[np.ndarray]
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._starts = None
+        self._ends = None
+
+    def _load(self):
+        with open(self.path, "rb") as file:
+            self._file = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        newlines = np.flatnonzero(np.frombuffer(self._file, dtype=np.uint8) == ord("\n"))
+        starts, ends = np.r_[0, newlines + 1], np.r_[newlines, len(self._file)]
+        non_empty = ends > starts
+        self._starts, self._ends = starts[non_empty], ends[non_empty]
+
+    def __len__(self) -> int:
+        if self._file is None:
+            self._load()
+        return len(self._starts)
+
+    def __getitem__(self, index: int) -> str:
+        if self._file is None:
+            self._load()
+        return self._file[self._starts[index]:self._ends[index]].decode().strip()
+
+
+words = WordList(WORDS_PATH)
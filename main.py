@@ -12,7 +12,7 @@ def main(tree_type: TreeType = TreeType.ordered_ltor):
 def simulate_time(net, tree_type):
     dataset = net.get_all_dataset_names()[0]
     print(f"\nSimulating distribution of dataset {dataset} with tree building algorithm {tree_type}")
-    net.distribute_series(dataset)
+    net.distribute_series(dataset, delta=True)
     for i in range(1 * 60):
         if i % 30 == 29:
             print(f"Iterated {i+1} days with {len(net.nodes)} nodes...")
@@ -24,7 +24,7 @@ def simulate_time(net, tree_type):
         #    net.remove_node(random.choice(nodes))
         net.tick()
         if i % 1 == 0:
-            net.distribute_series(dataset)
+            net.distribute_series(dataset, delta=True)
     net.print_dataset_intervals(dataset)
     net.print_dataset_distribution(dataset)
     print(net.tree)
@@ -34,7 +34,7 @@ def simulate_time(net, tree_type):
 def simulate_steady_growth(net: Network, days: int, growth_factor: float = 1.0):
     dataset = net.get_all_dataset_names()[0]
     print(f"\nSimulating steady growth...\nNetwork: {dataset}\nDays: {days}\nNew nodes per day: {growth_factor}")
-    net.distribute_series(dataset)
+    net.distribute_series(dataset, delta=True)
     net.allocate_dataframes(net.start_date, net.start_date + timedelta(days))
     net.print_dataset_intervals(dataset)
     for i in range(days):
@@ -50,17 +50,13 @@ def simulate_steady_growth(net: Network, days: int, growth_factor: float = 1.0):
                 net.create_nodes(np.floor(growth_factor), 1)
         net.tick()
         if i % 1 == 0:
-            net.distribute_series(dataset)
+            net.distribute_series(dataset, delta=True)
     net.print_dataset_intervals(dataset)
     net.print_dataset_distribution(dataset)
     print(net.tree)
     net.print_statistics(dataset)
 
 
-network = create_network(20, tree_type=TreeType.balanced_ltor)
-simulate_steady_growth(network, 60, 0.1)
-
-
 # Press the green button in the gutter to run the script.
 if __name__ == '__main__':
     #main(TreeType.ordered_ltor)
@@ -68,4 +64,5 @@ if __name__ == '__main__':
     #main(TreeType.balanced_ltor)
     #main(TreeType.balanced_rtol)
     #main(TreeType.balanced_random)
-    pass
\ No newline at end of file
+    network = create_network(20, tree_type=TreeType.balanced_ltor)
+    simulate_steady_growth(network, 60, 0.1)
\ No newline at end of file
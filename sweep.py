@@ -0,0 +1,131 @@
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any, Iterable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from core.network import TreeType, create_network
+from core.transport import SimulatedTransport
+
+
+class Run(NamedTuple):
+    tree_type: TreeType
+    nodes_cnt: int
+    days_of_data: int
+    growth_rate: float
+    churn_rate: float
+    seed: int
+    days: int
+    transport: bool = False  # distribute through the simulated link layer and record the network load
+
+    @property
+    def key(self) -> str:
+        return f"{self.tree_type.name}-{self.nodes_cnt}-{self.days_of_data}-{self.growth_rate}-{self.churn_rate}-" \
+               f"{self.seed}-{self.days}" + ("-transport" if self.transport else "")
+
+
+def grid(tree_types: Iterable[TreeType],
+         nodes_cnts: Iterable[int],
+         days_of_data: Iterable[int],
+         growth_rates: Iterable[float],
+         churn_rates: Iterable[float],
+         seeds: Iterable[int],
+         days: int = 60,
+         transport: bool = False) -> List[Run]:
+    return [Run(*params, days, transport) for params in itertools.product(
+        tree_types, nodes_cnts, days_of_data, growth_rates, churn_rates, seeds)]
+
+
+def due(rate: float, day: int) -> int:
+    """Returns how many events of a fractional daily rate fall on given day."""
+    return int(np.floor(rate * (day + 1)) - np.floor(rate * day))
+
+
+def simulate(run: Run) -> Dict[str, Any]:
+    """Simulates a single run and returns its summary statistics. With `transport`, distributions go through the
+    simulated link layer and the network load is added to the statistics."""
+    random.seed(run.seed)
+    started = time.perf_counter()
+    net = create_network(run.nodes_cnt, run.days_of_data, tree_type=run.tree_type)
+    if run.transport:
+        net.transport = SimulatedTransport(seed=run.seed)
+    owner = next(iter(net.nodes.values()))
+    dataset = owner.own_data.columns[0]
+    transferred = net.distribute_series(dataset, delta=True)
+    for day in range(run.days):
+        net.create_nodes(due(run.growth_rate, day), 1)
+        for _ in range(min(due(run.churn_rate, day), len(net.nodes) - 1)):
+            net.remove_node(random.choice([name for name in net.nodes if name != owner.name]))
+        net.tick()
+        transferred += net.distribute_series(dataset, delta=True)
+    stats = {
+        "key": run.key,
+        **run._asdict(),
+        "tree_type": run.tree_type.name,
+        **net.statistics(dataset),
+        "transferred_cells": transferred,
+    }
+    if run.transport:
+        reports = net.transport.reports
+        stats["makespan"] = sum(report.makespan for report in reports)
+        stats["network_bytes"] = sum(report.total_bytes for report in reports)
+        stats["busiest_uplink_seconds"] = max(max(report.busy.values(), default=0.0) for report in reports)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def load_results(path: str) -> pd.DataFrame:
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    with np.load(path, allow_pickle=False) as columns:
+        return pd.DataFrame({column: columns[column] for column in columns.files})
+
+
+def save_results(results: pd.DataFrame, path: str):
+    """Writes the results column by column, replacing the file atomically."""
+    tmp = f"{path}.tmp.npz"
+    columns = {column: results[column].to_numpy() for column in results.columns}
+    np.savez(tmp, **{column: values.astype(str) if values.dtype == object else values
+                     for column, values in columns.items()})
+    os.replace(tmp, path)
+
+
+def sweep(runs: List[Run], path: str, workers: int = None) -> pd.DataFrame:
+    """Runs all simulations which do not have results in the file at `path` yet on a process pool and appends a row
+    of summary statistics per run to it as soon as the run finishes."""
+    results = load_results(path)
+    done = set(results["key"]) if len(results) else set()
+    pending = [run for run in runs if run.key not in done]
+    print(f"Running {len(pending)} of {len(runs)} runs, {len(runs) - len(pending)} already done")
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(simulate, run) for run in pending]
+        for i, future in enumerate(as_completed(futures)):
+            row = future.result()
+            results = pd.concat([results, pd.DataFrame([row])], ignore_index=True)
+            save_results(results, path)
+            print(f"[{i + 1}/{len(pending)}] {row['key']} in {row['seconds']:.1f} s")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Runs a parameter sweep of network simulations.")
+    tree_type_names = [t.name for t in TreeType]
+    parser.add_argument("--tree-types", nargs="+", default=tree_type_names, choices=tree_type_names)
+    parser.add_argument("--nodes", nargs="+", type=int, default=[20, 100])
+    parser.add_argument("--days-of-data", nargs="+", type=int, default=[100])
+    parser.add_argument("--growth", nargs="+", type=float, default=[0.1, 1.0])
+    parser.add_argument("--churn", nargs="+", type=float, default=[0.0, 0.1])
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="sweep_results.npz")
+    parser.add_argument("--transport", action="store_true", help="measure the network load of the distributions")
+    args = parser.parse_args()
+    sweep(grid([TreeType[t] for t in args.tree_types], args.nodes, args.days_of_data, args.growth, args.churn,
+               args.seeds, args.days, args.transport),
+          args.output, args.workers)
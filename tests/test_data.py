@@ -0,0 +1,99 @@
+from copy import copy
+
+import numpy as np
+import pytest
+
+from core.data import IntervalSet, IntervalSeries
+
+
+def days(*values: str) -> np.ndarray:
+    return np.array(values, dtype="datetime64[D]")
+
+
+def test_copy_survives_grow_then_split_write():
+    series = IntervalSeries()
+    series["a"] = IntervalSet(days("2020-01-01", "2020-01-10"), days("2020-01-03", "2020-01-12"))
+    copied = copy(series)
+    series.add_intervals(["b", "c", "d", "e"], days(*["2020-02-01"] * 4), days(*["2020-02-05"] * 4))
+    series.add_intervals(["a"], days("2020-03-01"), days("2020-03-02"))
+    assert copied["a"] == IntervalSet(days("2020-01-01", "2020-01-10"), days("2020-01-03", "2020-01-12"))
+    assert len(series["a"]) == 3
+    assert "b" not in copied
+
+
+BASE = np.datetime64("2020-01-01", "D")
+DAYS = 60
+
+
+def random_intervals(rng: np.random.Generator, count: int):
+    starts = BASE + rng.integers(0, DAYS, count)
+    return starts, starts + rng.integers(0, 12, count)
+
+
+def dense(intervals: IntervalSet) -> np.ndarray:
+    return intervals.contains(BASE + np.arange(DAYS + 12))
+
+
+def from_dense(held: np.ndarray) -> IntervalSet:
+    edges = np.diff(np.r_[0, held.astype(np.int8), 0])
+    return IntervalSet(BASE + np.flatnonzero(edges == 1), BASE + np.flatnonzero(edges == -1))
+
+
+def span(start: np.datetime64, end: np.datetime64) -> slice:
+    return slice(int((start - BASE).astype(np.int64)), int((end - BASE).astype(np.int64)))
+
+
+def normalized(intervals: IntervalSet) -> bool:
+    return bool((intervals.starts < intervals.ends).all() and (intervals.starts[1:] > intervals.ends[:-1]).all())
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_interval_set_matches_dense(seed):
+    rng = np.random.default_rng(seed)
+    a, b = IntervalSet(*random_intervals(rng, 8)), IntervalSet(*random_intervals(rng, 8))
+    for intervals in (a, b):
+        assert normalized(intervals)
+        assert from_dense(dense(intervals)) == intervals
+        assert intervals.count() == dense(intervals).sum()
+    for result, expected in [(a.union(b), dense(a) | dense(b)),
+                             (a.intersection(b), dense(a) & dense(b)),
+                             (a.difference(b), dense(a) & ~dense(b))]:
+        assert normalized(result)
+        assert result == from_dense(expected)
+    start, end = sorted(BASE + rng.integers(0, DAYS, 2))
+    window = np.zeros(DAYS + 12, dtype=bool)
+    window[span(start, end)] = True
+    assert a.clip(start, end) == from_dense(dense(a) & window)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_interval_series_matches_dense(seed):
+    rng = np.random.default_rng(seed)
+    features = ["a", "b", "c", "d", "e"]
+    series, held = IntervalSeries(), {}
+    copies = []
+    for step in range(30):
+        count = int(rng.integers(1, 8))
+        batch = [features[i] for i in rng.integers(0, len(features), count)]
+        starts, ends = random_intervals(rng, count)
+        remove = step > 3 and rng.random() < 0.4
+        if remove:
+            series.remove_intervals(batch, starts, ends)
+        else:
+            series.add_intervals(batch, starts, ends)
+        for feature, start, end in zip(batch, starts, ends):
+            if remove and feature not in held:
+                continue
+            row = held.setdefault(feature, np.zeros(DAYS + 12, dtype=bool))
+            row[span(start, end)] = not remove
+        if rng.random() < 0.3:
+            copies.append((copy(series), {feature: row.copy() for feature, row in held.items()}))
+        if step % 10 == 9 and held:
+            deleted = sorted(held)[int(rng.integers(0, len(held)))]
+            del series[deleted], held[deleted]
+        for copied, expected in copies + [(series, held)]:
+            assert sorted(copied.columns) == sorted(expected)
+            for feature, row in expected.items():
+                assert copied[feature] == from_dense(row)
+                assert copied.observations(feature) == row.sum()
+            assert copied.count() == sum(row.sum() for row in expected.values())
@@ -0,0 +1,15 @@
+from core.network import create_network
+
+
+def test_dataset_added_later_spans_its_own_days():
+    net = create_network(20, 30)
+    net.add_datasets("3", 1)
+    for _ in range(10):
+        net.tick()
+    net.distribute_datasets()
+    earliest, latest = net.dataset_span("3-2")
+    assert (latest - earliest).days + 1 == 11
+    assert len(net.dataset_copies("3-2")) == 11
+    assert net.dataset_copies("3-2").min() > 0
+    assert net.minimal_cover("3-2") is not None
+    assert net.statistics("3-2")["total_slices"] == 11
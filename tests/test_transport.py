@@ -0,0 +1,27 @@
+import random
+
+import pytest
+
+from core.network import create_network
+from core.transport import Link, SimulatedTransport
+
+
+@pytest.mark.parametrize("links", [(Link(loss=1.0), None), (Link(), {"1": Link(loss=-0.1)})])
+def test_links_losing_every_message_are_rejected(links):
+    with pytest.raises(ValueError):
+        SimulatedTransport(*links)
+
+
+def test_own_slices_are_not_sent():
+    random.seed(0)
+    direct = create_network(12)
+    simulated = direct.fork()
+    simulated.transport = SimulatedTransport(seed=0)
+    direct.distribute_datasets()
+    simulated.distribute_datasets()
+    report = simulated.transport.reports[-1]
+    for name, node in direct.nodes.items():
+        assert node.received_data.features == simulated.nodes[name].received_data.features
+    # every node receives a slice from each of the other owners, and none of its own
+    assert report.messages == len(direct.nodes) * (len(direct.nodes) - 1)
+    assert report.bytes_sent.keys() == report.busy.keys()
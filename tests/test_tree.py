@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from core.tree import IntervalTreeNode, build_ordered, build_balanced, insert_balanced, remove_balanced, \
+    ordered_ranks, ordered_index
+
+
+def check_subtrees(root: IntervalTreeNode):
+    for node in root.left_to_right:
+        assert node.size == len(node.left_to_right)
+        assert node.extent == len(node.values)
+        for child in (node.left, node.right):
+            if child is not None:
+                assert child.parent is node
+
+
+@pytest.mark.parametrize("direction", ["ltor", "rtol"])
+def test_ordered_positions_match_traversal(direction):
+    for count in range(1, 301):
+        tree = build_ordered(list(range(count)), direction)
+        positions = [node.value for node in tree.left_to_right]
+        assert list(ordered_ranks(count, direction)[positions]) == list(range(count))
+        assert [ordered_index(rank, count, direction) for rank in range(count)] == positions
+
+
+@pytest.mark.parametrize("direction", ["ltor", "rtol"])
+def test_ordered_subtrees(direction):
+    for count in (1, 2, 3, 7, 8, 100):
+        check_subtrees(build_ordered(list(range(count)), direction))
+
+
+@pytest.mark.parametrize("direction", ["ltor", "rtol", "random"])
+def test_balanced_subtrees_after_random_changes(direction):
+    random.seed(1)
+    root = build_balanced(list(range(20)), direction)
+    nodes = {node.value: node for node in root.left_to_right}
+    created = len(nodes)
+    for step in range(400):
+        if nodes and random.random() < 0.45:
+            root = remove_balanced(root, nodes.pop(random.choice(list(nodes))))
+        else:
+            nodes[created] = IntervalTreeNode(created)
+            root = insert_balanced(root, nodes[created], direction)
+            created += 1
+        if root is None:
+            assert not nodes
+            continue
+        assert root.parent is None
+        assert sorted(node.value for node in root.left_to_right) == sorted(nodes)
+        if step % 10 == 0:
+            check_subtrees(root)